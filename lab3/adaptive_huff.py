@@ -1,48 +1,158 @@
 from bitarray import bitarray
+from bitarray.util import ba2int, int2ba
 
 
 # ----------------------------------------- FILE FORMAT -----------------------------------------|
-# Two parts:                                                                                     |
+# Version 3 (default, any bytes):                                                                |
+#       - magic bytes (4) followed by version (1 byte)                                           |
+#       - engine (1 byte), position of its name in ENGINES                                       |
+#       - bits obtained from adaptive huffman encoding of bytes                                  |
+#         over 256 symbols plus EOF (see encode_bytes), zero padded                              |
+#                                                                                                |
+# Version 2 is version 3 without engine byte, engine is always 'vitter'.                         |
+#                                                                                                |
+# Version 1 (legacy, text only) has two parts:                                                   |
 #       - few bytes (4) for int denoting                                                         |
 #         total number of following bits                                                         |
 #       - bits obtained from adaptive huffman decoding                                           |
+# Version 1 file would need over 2^31 bits to start with magic bytes.                            |
 # ----------------------------------------- FILE FORMAT -----------------------------------------|
-def compress_file(filename, save_to):
-    bits = None
-    with open(filename, "r") as file:
-        text = file.read()
-        bits = encode(text)
-
-    with open(save_to, 'wb') as file:
-        no = int(len(bits))
-
-        file.write(len(bits).to_bytes(4, byteorder='big', signed=False))
-        bits.tofile(file)
-
-
-def decompress_file(filename, save_to):
-    text = None
+MAGIC = b'\x89AHF'
+BLOCK_SIZE = 1 << 20
+
+# Byte values and EOF, new symbols are escaped with NYT code followed by symbol on ESCAPE_BITS.
+EOF = 256
+SYMBOLS = 257
+ESCAPE_BITS = 9
+NODES = 2 * SYMBOLS + 1
+
+
+def compress_file(filename, save_to, block_size=BLOCK_SIZE, version=3, engine='fgk'):
+    """
+        Input is read and encoded in blocks of block_size bytes,
+        only whole bytes are flushed and the remaining bits carry over to the next block.
+        Engine is stored in version 3 files, version 2 always uses VitterTree.
+    """
+    if version == 1:
+        return compress_file_v1(filename, save_to, block_size, engine)
+    if version not in (2, 3):
+        raise ValueError(f'Unsupported file version: {version}')
+
+    if version == 2:
+        engine = 'vitter'
+    with open(filename, "rb") as src, open(save_to, 'wb') as file:
+        file.write(MAGIC + bytes([version]))
+        if version == 3:
+            file.write(bytes([list(ENGINES).index(engine)]))
+
+        tree = ENGINES[engine](NODES)
+        pending = bitarray()
+        while True:
+            data = src.read(block_size)
+            pending += encode_bytes(data, tree=tree, final=not data)
+            full = len(pending) - len(pending) % 8
+            pending[:full].tofile(file)
+            pending = pending[full:]
+            if not data:
+                break
+
+        pending.tofile(file)
+
+
+def decompress_file(filename, save_to, block_size=BLOCK_SIZE, engine='fgk'):
+    """
+        Engine is used only for legacy version 1 files and has to match the one used to compress,
+        newer versions know their engine.
+    """
     with open(filename, "rb") as file:
-        no = int.from_bytes(file.read(4), byteorder='big', signed=False)
-        bits = bitarray()
-        bits.fromfile(file)
-
-        text = decode(bits[:no])
-
-    with open(save_to, "w") as file:
-        file.write(text)
+        head = file.read(4)
+        if head != MAGIC:
+            return decompress_v1(file, head, save_to, block_size, engine)
+
+        version = file.read(1)[0]
+        if version == 2:
+            engine = 'vitter'
+        elif version == 3:
+            engine = list(ENGINES)[file.read(1)[0]]
+        else:
+            raise ValueError(f'Unsupported file version: {version}')
+
+        def chunks():
+            while True:
+                bits = bitarray()
+                bits.frombytes(file.read(block_size))
+                if not bits:
+                    break
+                yield bits
+
+        with open(save_to, "wb") as out:
+            for data in decode_bytes_stream(chunks(), engine):
+                out.write(data)
+
+
+def compress_file_v1(filename, save_to, block_size=BLOCK_SIZE, engine='fgk'):
+    """
+        Text is read and encoded in blocks of block_size characters,
+        only whole bytes are flushed and the remaining bits carry over to the next block.
+        Total number of bits is patched into the header at the end.
+        Engine is not stored, so decompress_file has to be given the same one.
+    """
+    with open(filename, "r") as src, open(save_to, 'wb') as file:
+        file.write(bytes(4))
+
+        tree = ENGINES[engine](53)
+        pending = bitarray()
+        no = 0
+        while True:
+            text = src.read(block_size)
+            if not text:
+                break
+
+            pending += encode(text, tree=tree)
+            full = len(pending) - len(pending) % 8
+            pending[:full].tofile(file)
+            pending = pending[full:]
+            no += full
+
+        no += len(pending)
+        pending.tofile(file)
+
+        file.seek(0)
+        file.write(no.to_bytes(4, byteorder='big', signed=False))
+
+
+def decompress_v1(file, head, save_to, block_size=BLOCK_SIZE, engine='fgk'):
+    with open(save_to, "w") as out:
+        no = int.from_bytes(head, byteorder='big', signed=False)
+
+        def chunks():
+            left = no
+            while left > 0:
+                bits = bitarray()
+                bits.frombytes(file.read(block_size))
+                if not bits:
+                    break
+                yield bits[:left]
+                left -= len(bits)
+
+        for text in decode_stream(chunks(), engine=engine):
+            out.write(text)
 # -------------------------------------------- FILE ---------------------------------------------|
 
 
-def encode(text, N=53):
+def encode(text, N=53, tree=None, engine='fgk'):
+    """
+        Passing tree continues encoding from its state (and updates it).
+        Engine is either 'fgk' (Tree) or 'vitter' (VitterTree), see ENGINES.
+    """
     bits = bitarray()
-    tree = Tree(N)
+    if tree is None:
+        tree = ENGINES[engine](N)
     for letter in text:
         if letter in tree.leaves:
             bits += tree.get_code(letter)
 
-            node = tree.leaves[letter]
-            tree.update(node)
+            tree.increment(letter)
         else:
             code = tree.get_code('NYT')
             code.frombytes(letter.encode())
@@ -53,54 +163,140 @@ def encode(text, N=53):
     return bits
 
 
-def decode(bits, N=53):
-    tree = Tree(N)
-    decoded = ''
-    i, current = 0, tree.root
-    while i < len(bits):
-        if current.is_leaf():
-            letter = None
-            if current.char == 'NYT':
-                byte = bits[i:i+8]
-                letter = byte.tobytes().decode()
-                i += 8
+def decode(bits, N=53, engine='fgk'):
+    return ''.join(decode_stream([bits], N, engine))
+
 
-                tree.spawn(letter)
+def decode_stream(chunks, N=53, engine='fgk'):
+    """
+        Generator decoding bits which arrive in chunks (bitarrays),
+        yields text decoded from each chunk. Bits of codes split
+        between chunks are kept until the next chunk arrives.
+    """
+    tree = ENGINES[engine](N)
+    current = tree.root
+    bits = bitarray()
+    for chunk in chunks:
+        bits += chunk
+        decoded = []
+        i = 0
+        while i < len(bits):
+            if tree.is_leaf(current):
+                letter = None
+                if tree.char(current) == 'NYT':
+                    if i + 8 > len(bits):
+                        break
+                    byte = bits[i:i+8]
+                    letter = byte.tobytes().decode()
+                    i += 8
+
+                    tree.spawn(letter)
+                else:
+                    letter = tree.char(current)
+
+                    tree.increment(letter)
+
+                decoded.append(letter)
+                current = tree.root
             else:
-                letter = current.char
+                current = tree.walk(current, bits[i])
+
+                i += 1
 
-                node = tree.leaves[letter]
-                tree.update(node)
+        bits = bits[i:]
+        yield ''.join(decoded)
 
-            decoded += letter
-            current = tree.root
+    # In case we finished in leaf.
+    if tree.is_leaf(current) and tree.char(current) != 'NYT':
+        letter = tree.char(current)
+
+        tree.increment(letter)
+
+        yield letter
+
+
+def encode_bytes(data, tree=None, final=True, engine='vitter'):
+    """
+        Encodes bytes over alphabet of 256 byte values plus EOF, which is appended when final.
+        New symbol is written as NYT code followed by its value on ESCAPE_BITS bits.
+        Passing tree (of any engine, with NODES nodes) continues encoding from its state.
+    """
+    if tree is None:
+        tree = ENGINES[engine](NODES)
+
+    bits = bitarray()
+    leaves = tree.leaves
+
+    def emit(symbol):
+        nonlocal bits
+        if symbol in leaves:
+            bits += tree.get_code(symbol)
+            tree.increment(symbol)
         else:
-            if not bits[i]:
-                current = current.leftKid
-            else:
-                current = current.rightKid
+            bits += tree.get_code('NYT')
+            bits += int2ba(symbol, ESCAPE_BITS)
+            tree.spawn(symbol)
 
-            i += 1
+    for symbol in data:
+        emit(symbol)
+    if final:
+        emit(EOF)
+
+    return bits
 
-    # In case we finished in leaf.
-    if current.is_leaf():
-        letter = current.char
 
-        node = tree.leaves[letter]
-        tree.update(node)
+def decode_bytes(bits, engine='vitter'):
+    return b''.join(decode_bytes_stream([bits], engine))
 
-        decoded += letter
-        current = tree.root
 
-    return decoded
+def decode_bytes_stream(chunks, engine='vitter'):
+    """
+        Generator decoding bits produced by encode_bytes which arrive in chunks (bitarrays),
+        yields bytes decoded from each chunk and stops at EOF.
+    """
+    tree = ENGINES[engine](NODES)
+    char, walk = tree.char, tree.walk
+    root = current = tree.root
+    bits = bitarray()
+    for chunk in chunks:
+        bits += chunk
+        decoded = bytearray()
+        i, n = 0, len(bits)
+        while True:
+            letter = char(current)
+            if letter is not None:
+                if letter == 'NYT':
+                    if i + ESCAPE_BITS > n:
+                        break
+                    letter = ba2int(bits[i:i + ESCAPE_BITS])
+                    i += ESCAPE_BITS
+                    tree.spawn(letter)
+                else:
+                    tree.increment(letter)
+
+                if letter == EOF:
+                    yield bytes(decoded)
+                    return
+
+                decoded.append(letter)
+                current = root
+            elif i < n:
+                current = walk(current, bits[i])
+                i += 1
+            else:
+                break
 
+        bits = bits[i:]
+        yield bytes(decoded)
 
-def adaptive_huffman(text, N=53):
-    tree = Tree(N)
+    raise ValueError('Bits ended before EOF.')
+
+
+def adaptive_huffman(text, N=53, engine='fgk'):
+    tree = ENGINES[engine](N)
     for letter in text:
         if letter in tree.leaves:
-            node = tree.leaves[letter]
-            tree.update(node)
+            tree.increment(letter)
         else:
             tree.spawn(letter)
 
@@ -158,6 +354,19 @@ class Tree:
 
         self.update(NYT)
 
+    def increment(self, letter):
+        self.update(self.leaves[letter])
+
+    def walk(self, node, bit):
+        """ Used when decoding. """
+        return node.rightKid if bit else node.leftKid
+
+    def is_leaf(self, node):
+        return node.is_leaf()
+
+    def char(self, node):
+        return node.char
+
     def update(self, node):
         # We do not swap node with its parent.
         if node.parent != None and node.parent.w != node.w:
@@ -255,3 +464,194 @@ class Node:
 
     def is_leaf(self):
         return self.leftKid == None
+
+
+class VitterTree:
+    """
+        Vitter's algorithm (Lambda) kept in implicit numbered arrays.
+
+        Node numbers are positions in arrays: root has number N, siblings
+        have consecutive numbers (right one is higher) and numbers never change,
+        only contents (weight, symbol, children) move between them.
+        Within the numbering weights do not decrease and for equal weights
+        leaves come before internal nodes. Nodes with equal weight and type form a block,
+        highest number in a block is its leader and leaders are kept in a dict,
+        so finding them is O(1). Sliding past a block moves every node of that block
+        by one number (see slide_and_increment), so it is linear in block length,
+        not constant time per level as with Vitter's floating tree representation.
+    """
+
+    def __init__(self, N):
+        self.N = N
+        self.weight = [0] * (N + 1)
+        self.symbol = [None] * (N + 1)
+        self.child = [0] * (N + 1)
+        # 0 stands for no parent.
+        self.parent = [0] * (N + 1)
+
+        self.symbol[N] = 'NYT'
+        self.root = N
+        self.leaves = {'NYT': N}
+        # Block key (see key) => its leader.
+        self.leader = {1: N}
+
+    def get_code(self, letter):
+        """ Used when encoding. """
+        if letter not in self.leaves:
+            raise Exception("Sth went terribly wrong!")
+
+        parents, child = self.parent, self.child
+        p = self.leaves[letter]
+        code = bitarray()
+        parent = parents[p]
+        while parent:
+            code.append(child[parent] == p)
+            p, parent = parent, parents[parent]
+        code.reverse()
+
+        return code
+
+    def walk(self, p, bit):
+        """ Used when decoding. """
+        return self.child[p] if bit else self.child[p] - 1
+
+    def is_leaf(self, p):
+        return self.symbol[p] is not None
+
+    def char(self, p):
+        return self.symbol[p]
+
+    def increment(self, letter):
+        self.update(letter)
+
+    def spawn(self, letter):
+        self.update(letter)
+
+    def key(self, p):
+        """ Block of p as single int: 2 * weight + 1 for leaves, 2 * weight for internal nodes. """
+        return 2 * self.weight[p] + (self.symbol[p] is not None)
+
+    def update(self, letter):
+        leaf_to_increment = 0
+        if letter not in self.leaves:
+            # Old NYT becomes parent of new NYT and new leaf.
+            q = self.leaves['NYT']
+            if q < 3:
+                raise Exception("Sth went terribly wrong!")
+
+            right, left = q - 1, q - 2
+            self.symbol[q], self.child[q] = None, right
+            self.parent[right] = self.parent[left] = q
+            self.symbol[right], self.symbol[left] = letter, 'NYT'
+            self.leaves[letter], self.leaves['NYT'] = right, left
+
+            # Leaves and internal nodes of weight 0.
+            self.leader[1] = right
+            self.leader[0] = q
+            leaf_to_increment = right
+        else:
+            q = self.leaves[letter]
+            leader = self.leader[self.key(q)]
+            if leader != q:
+                self.swap(q, leader)
+                q = leader
+
+            if self.parent[q] == self.parent[self.leaves['NYT']]:
+                leaf_to_increment = q
+                q = self.parent[q]
+
+        self.slide_and_increment(q, climb=True)
+
+        if leaf_to_increment:
+            self.slide_and_increment(leaf_to_increment)
+
+    def slide_and_increment(self, p, climb=False):
+        """
+            Slides p (leader of its block) past the next block if invariant
+            requires it, increments its weight and returns the node to continue with.
+            With climb it goes on with the returned nodes up to the root, within one call.
+            Every node of the block is moved down by one number, so sliding costs
+            O(block length), which in practice is a small part of the work
+            (most calls slide past nothing).
+        """
+        weight, symbol, child, parent, leader = self.weight, self.symbol, self.child, self.parent, self.leader
+        N = self.N
+        while p:
+            w = weight[p]
+            is_leaf = symbol[p] is not None
+            key = 2 * w + is_leaf
+            former_parent = parent[p]
+            new_p = p
+
+            if p < N:
+                # Leaf slides past internal nodes of the same weight,
+                # internal node past leaves of weight bigger by one.
+                block = key - 1 if is_leaf else key + 3
+                if 2 * weight[p + 1] + (symbol[p + 1] is not None) == block:
+                    new_p = leader[block]
+                    content = w, symbol[p], child[p]
+                    weight[p:new_p] = weight[p + 1:new_p + 1]
+                    symbol[p:new_p] = symbol[p + 1:new_p + 1]
+                    child[p:new_p] = child[p + 1:new_p + 1]
+                    self.relink(p, new_p)
+                    self.place(new_p, *content)
+                    leader[block] = new_p - 1
+
+            # p was the leader of its old block.
+            if p > 1 and 2 * weight[p - 1] + (symbol[p - 1] is not None) == key:
+                leader[key] = p - 1
+            else:
+                del leader[key]
+
+            weight[new_p] = w + 1
+            if key + 2 not in leader:
+                leader[key + 2] = new_p
+
+            p = parent[new_p] if is_leaf else former_parent
+            if not climb:
+                return p
+
+        return 0
+
+    def relink(self, start, stop):
+        """ Fixes links of children or leaves of nodes numbered from start to stop - 1. """
+        symbol, child, parent, leaves = self.symbol, self.child, self.parent, self.leaves
+        for i in range(start, stop):
+            letter = symbol[i]
+            if letter is None:
+                parent[child[i]] = parent[child[i] - 1] = i
+            else:
+                leaves[letter] = i
+
+    def swap(self, p, q):
+        content = self.weight[p], self.symbol[p], self.child[p]
+        self.place(p, self.weight[q], self.symbol[q], self.child[q])
+        self.place(q, *content)
+
+    def place(self, p, weight, symbol, child):
+        """ Puts node contents at number p fixing links of its children or leaves. """
+        self.weight[p], self.symbol[p], self.child[p] = weight, symbol, child
+        if symbol is None:
+            self.parent[child] = self.parent[child - 1] = p
+        else:
+            self.leaves[symbol] = p
+
+    def __repr__(self):
+        return '-' * 5 + 'HUFFMAN TREE' + '-' * 5 + \
+            '\n' + self.str_repr_util(self.root)
+
+    def str_repr_util(self, p, spaces=1):
+        me = f'#{{ W={self.weight[p]}, N={p} }}'
+
+        if self.is_leaf(p):
+            me += f' => {self.symbol[p]}'
+        else:
+            left = self.str_repr_util(self.child[p] - 1, spaces + 1)
+            right = self.str_repr_util(self.child[p], spaces + 1)
+            me += '\n' + (' ' * spaces) + '0 -> ' + left
+            me += '\n' + (' ' * spaces) + '1 -> ' + right
+
+        return me
+
+
+ENGINES = {'fgk': Tree, 'vitter': VitterTree}
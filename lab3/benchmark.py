@@ -0,0 +1,171 @@
+"""
+    Benchmark of compression codecs from this folder.
+
+    Every codec is run over synthetic files and text files bundled with other labs.
+    Each (codec, file) pair is measured in a fresh process, so that peak RSS belongs to it alone.
+    Results are written as JSON, so runs can be diffed between versions.
+
+    Usage: python benchmark.py [--codecs static adaptive ...] [--repeat 5] [--output results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import adaptive_huff
+import bwt
+import context_huff
+import lz77
+import static_huff
+
+CODECS = {
+    'static': (static_huff.compress_file, static_huff.decompress_file),
+    'adaptive': (adaptive_huff.compress_file, adaptive_huff.decompress_file),
+    'context': (context_huff.compress_file, context_huff.decompress_file),
+    'lz77': (lz77.compress_file, lz77.decompress_file),
+    'bwt': (bwt.compress_file, bwt.decompress_file),
+}
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUNDLED = [
+    os.path.join(HERE, '..', 'lab4', 'resources', 'romeo-i-julia-700.txt'),
+    os.path.join(HERE, '..', 'lab2', '1997_714.txt'),
+]
+
+
+def synthetic_corpus(directory, size, seed=0):
+    """
+        Writes synthetic files of given size (in bytes) and returns their paths:
+            - uniform: random lowercase letters in lines of 100 characters (as in code.ipynb),
+            - skewed: bytes with geometric distribution,
+            - repetitive: random log-like lines drawn from small set.
+    """
+    rand = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
+    uniform = bytearray()
+    while len(uniform) < size:
+        uniform += ''.join(rand.choice(letters) for _ in range(99)).encode() + b'\n'
+
+    skewed = bytes(min(int(rand.expovariate(0.5)), 255) for _ in range(size))
+
+    templates = [f'{level} [{module}] request {{}} took {{}} ms\n'
+                 for level in ('INFO', 'WARN', 'DEBUG') for module in ('db', 'http', 'cache')]
+    repetitive = bytearray()
+    while len(repetitive) < size:
+        line = rand.choice(templates).format(rand.randrange(1000), rand.randrange(100))
+        repetitive += line.encode()
+
+    paths = []
+    for name, data in (('uniform', uniform), ('skewed', skewed), ('repetitive', repetitive)):
+        path = os.path.join(directory, f'{name}.bin')
+        with open(path, 'wb') as file:
+            file.write(bytes(data[:size]))
+        paths.append(path)
+
+    return paths
+
+
+def measure(codec, path, repeat, directory):
+    """
+        Runs in child process. Returns dict with best times of repeat runs,
+        throughput, compression ratio and peak RSS of the process.
+    """
+    compress, decompress = CODECS[codec]
+    compressed = os.path.join(directory, f'{codec}.out')
+    restored = os.path.join(directory, f'{codec}.restored')
+
+    compress_times, decompress_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compress(path, compressed)
+        compress_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        decompress(compressed, restored)
+        decompress_times.append(time.perf_counter() - start)
+
+    with open(path, 'rb') as original, open(restored, 'rb') as result:
+        correct = original.read() == result.read()
+
+    size = os.path.getsize(path)
+    compressed_size = os.path.getsize(compressed)
+    megabytes = size / 2 ** 20
+    compress_time, decompress_time = min(compress_times), min(decompress_times)
+
+    return {
+        'codec': codec,
+        'file': os.path.basename(path),
+        'size': size,
+        'compressed_size': compressed_size,
+        'ratio': compressed_size / size if size else 0.0,
+        'compress_s': compress_time,
+        'decompress_s': decompress_time,
+        'compress_MBps': megabytes / compress_time if compress_time else 0.0,
+        'decompress_MBps': megabytes / decompress_time if decompress_time else 0.0,
+        # Kilobytes on Linux.
+        'peak_rss_kB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'correct': correct,
+    }
+
+
+def run(codecs, files, repeat):
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as directory:
+        for path in files:
+            for codec in codecs:
+                with context.Pool(1) as pool:
+                    result = pool.apply(measure, (codec, path, repeat, directory))
+                results.append(result)
+                print(f"{result['codec']:>9} {result['file']:>24}: "
+                      f"ratio {result['ratio']:.3f}, "
+                      f"compress {result['compress_MBps']:.2f} MB/s, "
+                      f"decompress {result['decompress_MBps']:.2f} MB/s, "
+                      f"peak RSS {result['peak_rss_kB']} kB", file=sys.stderr)
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark compression codecs.')
+    parser.add_argument('--codecs', nargs='+', choices=sorted(CODECS), default=list(CODECS))
+    parser.add_argument('--repeat', type=int, default=3, help='timing runs per file, best one is reported')
+    parser.add_argument('--synthetic-size', type=int, default=1 << 20, help='size of synthetic files in bytes')
+    parser.add_argument('--files', nargs='*', default=[], help='additional files to compress')
+    parser.add_argument('--no-bundled', action='store_true', help='skip text files bundled with labs')
+    parser.add_argument('--output', help='JSON file for results (stdout by default)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = synthetic_corpus(directory, args.synthetic_size)
+        if not args.no_bundled:
+            files += [path for path in BUNDLED if os.path.exists(path)]
+        files += args.files
+
+        results = run(args.codecs, files, args.repeat)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'synthetic_size': args.synthetic_size,
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import numpy as np
+import static_huff
+import suffix_array
+from lz77 import from_varints, to_varints
+
+BLOCK_SIZE = 1 << 20
+
+
+# ----------------------------------------- FILE FORMAT -----------------------------------------|
+# 1. Magic bytes (4 bytes) followed by version (1 byte).                                         |
+# 2. Sequence of blocks, each encoding at most block_size bytes of input:                        |
+#       - number of encoded bytes (8 bytes),                                                     |
+#       - row of end marker in Burrows-Wheeler transform (8 bytes),                              |
+#       - two streams, each written as static_huff block (see static_huff.write_block):          |
+#           move-to-front output with runs of zeros squeezed into single zero,                   |
+#           lengths of those runs minus one as varints.                                          |
+# 3. Block with no encoded bytes marks the end.                                                  |
+# ----------------------------------------- FILE FORMAT -----------------------------------------|
+MAGIC = b'\x89BWT'
+
+
+def compress_file(filename, save_to, block_size=BLOCK_SIZE):
+    with open(filename, "rb") as src, open(save_to, 'wb') as file:
+        file.write(MAGIC + bytes([1]))
+        while True:
+            data = src.read(block_size)
+            file.write(len(data).to_bytes(8, byteorder='big', signed=False))
+            if not data:
+                break
+
+            last, primary = bwt(data)
+            symbols, runs = zero_runs(move_to_front(last))
+            file.write(primary.to_bytes(8, byteorder='big', signed=False))
+            static_huff.write_block(file, symbols)
+            static_huff.write_block(file, to_varints(runs))
+
+
+def decompress_file(filename, save_to):
+    with open(filename, "rb") as file, open(save_to, "wb") as out:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a bwt file.')
+        version = file.read(1)[0]
+        if version != 1:
+            raise ValueError(f'Unsupported file version: {version}')
+
+        while True:
+            size = int.from_bytes(file.read(8), byteorder='big', signed=False)
+            if not size:
+                break
+
+            primary = int.from_bytes(file.read(8), byteorder='big', signed=False)
+            symbols = static_huff.read_block(file)
+            runs = from_varints(static_huff.read_block(file))
+            last = inverse_move_to_front(expand_zero_runs(symbols, runs))
+            out.write(inverse_bwt(last, primary))
+# -------------------------------------------- FILE ---------------------------------------------|
+
+
+def bwt(data):
+    """
+        Burrows-Wheeler transform of data with implicit end marker (smaller than any byte).
+        Returns last column without the marker and row in which the marker was.
+    """
+    if not data:
+        return b'', 0
+
+    sa = suffix_array.suffix_array(data)
+    # Row 0 is rotation starting with marker, then rows follow suffix array.
+    previous = sa - 1
+    primary = int(np.flatnonzero(sa == 0)[0]) + 1
+    last = np.frombuffer(bytes(data), dtype=np.uint8)[previous[previous >= 0]]
+
+    return bytes(data[-1:]) + last.tobytes(), primary
+
+
+def inverse_bwt(last, primary):
+    """
+        Inverts bwt using LF-mapping: i-th occurrence of a byte in last column
+        is its i-th occurrence in first column. Mapping is computed by numpy with
+        stable sort, walking it is one step per byte.
+    """
+    n = len(last)
+    if n == 0:
+        return b''
+
+    # Marker goes back in, as -1 it sorts first.
+    column = np.empty(n + 1, dtype=np.int16)
+    column[:primary] = np.frombuffer(last[:primary], dtype=np.uint8)
+    column[primary] = -1
+    column[primary + 1:] = np.frombuffer(last[primary:], dtype=np.uint8)
+
+    order = np.argsort(column, kind='stable')
+    lf = np.empty(n + 1, dtype=np.int64)
+    lf[order] = np.arange(n + 1)
+
+    lf = lf.tolist()
+    column = column.tolist()
+    out = bytearray(n)
+    p = 0
+    for k in range(n - 1, -1, -1):
+        out[k] = column[p]
+        p = lf[p]
+
+    return bytes(out)
+
+
+def move_to_front(data):
+    table = list(range(256))
+    out = bytearray(len(data))
+    for i, byte in enumerate(data):
+        j = table.index(byte)
+        out[i] = j
+        if j:
+            del table[j]
+            table.insert(0, byte)
+
+    return bytes(out)
+
+
+def inverse_move_to_front(data):
+    table = list(range(256))
+    out = bytearray(len(data))
+    for i, j in enumerate(data):
+        byte = table[j]
+        out[i] = byte
+        if j:
+            del table[j]
+            table.insert(0, byte)
+
+    return bytes(out)
+
+
+def zero_runs(data):
+    """
+        Replaces every run of zeros with single zero. Returns bytes and lengths of runs minus one.
+    """
+    symbols = bytearray()
+    runs = []
+    run = 0
+    for byte in data:
+        if byte == 0:
+            run += 1
+            continue
+        if run:
+            symbols.append(0)
+            runs.append(run - 1)
+            run = 0
+        symbols.append(byte)
+
+    if run:
+        symbols.append(0)
+        runs.append(run - 1)
+
+    return bytes(symbols), runs
+
+
+def expand_zero_runs(symbols, runs):
+    out = bytearray()
+    runs = iter(runs)
+    for byte in symbols:
+        if byte == 0:
+            out += bytes(next(runs) + 1)
+        else:
+            out.append(byte)
+
+    return bytes(out)
@@ -0,0 +1,187 @@
+from collections import Counter
+from bitarray import bitarray
+import static_huff
+
+# Order-1 model: every preceding byte (context) may have its own code table,
+# rare contexts (and the first byte) fall back to order-0 table.
+
+# Tables are limited so that code lengths fit in half a byte.
+MAX_LENGTH = 15
+# Contexts seen fewer times never get their own table.
+MIN_CONTEXT = 64
+
+
+# ----------------------------------------- FILE FORMAT -----------------------------------------|
+# 1. Magic bytes (4 bytes) followed by version (1 byte).                                         |
+# 2. Number of encoded bytes (8 bytes).                                                          |
+# 3. Number of bits obtained from huffman encoding (8 bytes).                                    |
+# 4. Order-0 table.                                                                              |
+# 5. Bitmap (32 bytes) of contexts with own table followed by those tables in increasing order.  |
+# 6. Rest are bits obtained from huffman encoding.                                               |
+#                                                                                                |
+# Table is bitmap (32 bytes) of present byte values followed by their                            |
+# code lengths packed in half bytes.                                                             |
+# ----------------------------------------- FILE FORMAT -----------------------------------------|
+MAGIC = b'\x89CHF'
+
+
+def compress_file(filename, save_to):
+    data = None
+    with open(filename, "rb") as file:
+        data = file.read()
+
+    bits, order0, contexts = encode(data)
+    with open(save_to, 'wb') as file:
+        file.write(MAGIC + bytes([1]))
+        file.write(len(data).to_bytes(8, byteorder='big', signed=False))
+        file.write(len(bits).to_bytes(8, byteorder='big', signed=False))
+
+        write_table(file, order0)
+        present = bitarray(lengths is not None for lengths in contexts)
+        file.write(present.tobytes())
+        for lengths in contexts:
+            if lengths is not None:
+                write_table(file, lengths)
+
+        bits.tofile(file)
+
+
+def decompress_file(filename, save_to):
+    data = None
+    with open(filename, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not an order-1 huffman file.')
+        version = file.read(1)[0]
+        if version != 1:
+            raise ValueError(f'Unsupported file version: {version}')
+
+        no_symbols = int.from_bytes(file.read(8), byteorder='big', signed=False)
+        no_bits = int.from_bytes(file.read(8), byteorder='big', signed=False)
+
+        order0 = read_table(file)
+        present = bitarray()
+        present.frombytes(file.read(static_huff.ALPHABET // 8))
+        contexts = [read_table(file) if bit else None for bit in present]
+
+        bits = bitarray()
+        bits.frombytes(file.read((no_bits + 7) // 8))
+        data = decode(bits[:no_bits], order0, contexts, no_symbols)
+
+    with open(save_to, "wb") as file:
+        file.write(data)
+
+
+def write_table(file, lengths):
+    present = bitarray(size > 0 for size in lengths)
+    sizes = [size for size in lengths if size]
+    if len(sizes) % 2:
+        sizes.append(0)
+
+    file.write(present.tobytes())
+    file.write(bytes((sizes[i] << 4) | sizes[i + 1] for i in range(0, len(sizes), 2)))
+
+
+def read_table(file):
+    present = bitarray()
+    present.frombytes(file.read(static_huff.ALPHABET // 8))
+    count = present.count()
+    packed = file.read((count + 1) // 2)
+    sizes = iter([half for byte in packed for half in (byte >> 4, byte & 15)])
+
+    return [next(sizes) if bit else 0 for bit in present]
+# -------------------------------------------- FILE ---------------------------------------------|
+
+
+def order1_lengths(data):
+    """
+        Returns code lengths of order-0 table and list with code lengths for every context
+        (None if context uses order-0 table). Context gets its own table only
+        if it saves more bits than its table costs.
+    """
+    order0 = table_lengths(static_huff.count_frequencies(data))
+
+    pairs = Counter(zip(data, data[1:]))
+    counts = [{} for _ in range(static_huff.ALPHABET)]
+    for (prev, letter), count in pairs.items():
+        counts[prev][letter] = count
+
+    contexts = [None] * static_huff.ALPHABET
+    for prev, context_counts in enumerate(counts):
+        if sum(context_counts.values()) < MIN_CONTEXT:
+            continue
+
+        lengths = table_lengths(context_counts)
+        own = sum(count * lengths[letter] for letter, count in context_counts.items())
+        # Bitmap and half byte per length.
+        own += 8 * (static_huff.ALPHABET // 8 + (len(context_counts) + 1) // 2)
+        shared = sum(count * order0[letter] for letter, count in context_counts.items())
+        if own < shared:
+            contexts[prev] = lengths
+
+    return order0, contexts
+
+
+def table_lengths(counts):
+    lengths = [0] * static_huff.ALPHABET
+    if counts:
+        for letter, size in static_huff.limited_code_lengths(counts, MAX_LENGTH).items():
+            lengths[letter] = size
+
+    return lengths
+
+
+def encode(data):
+    """
+        Returns bits, order-0 code lengths and code lengths for every context (see order1_lengths).
+    """
+    order0, contexts = order1_lengths(data)
+    codes0 = static_huff.canonical_codes(order0)
+    codes = [codes0 if lengths is None else static_huff.canonical_codes(lengths)
+             for lengths in contexts]
+
+    bits = bitarray()
+    if data:
+        bits += codes0[data[0]]
+    for prev, letter in zip(data, data[1:]):
+        bits += codes[prev][letter]
+
+    return bits, order0, contexts
+
+
+def decode(bits, order0, contexts, no_symbols, k=static_huff.TABLE_BITS):
+    """
+        Table-driven decoding (see static_huff.table_decode) switching table after every byte.
+    """
+    out = bytearray(no_symbols)
+    if not no_symbols:
+        return bytes(out)
+
+    table0 = static_huff.lookup_table(static_huff.canonical_codes(order0), k)
+    tables = [table0 if lengths is None
+              else static_huff.lookup_table(static_huff.canonical_codes(lengths), k)
+              for lengths in contexts]
+
+    # Three bytes of padding, so that window never reaches past data.
+    data = bits.tobytes() + bytes(3)
+    mask = (1 << k) - 1
+    shift = 24 - k
+
+    pos = 0
+    table = table0
+    for n in range(no_symbols):
+        current = table
+        while True:
+            b = pos >> 3
+            window = (data[b] << 16) | (data[b + 1] << 8) | data[b + 2]
+            letter, step = current[(window >> (shift - (pos & 7))) & mask]
+            if letter is None:
+                current = step
+                pos += k
+            else:
+                pos += step
+                break
+
+        out[n] = letter
+        table = tables[letter]
+
+    return bytes(out)
@@ -0,0 +1,164 @@
+from io import BytesIO
+from bitarray import bitarray
+import static_huff
+import suffix_array
+
+# Shorter matches are written as literals.
+MIN_MATCH = 4
+BLOCK_SIZE = 1 << 20
+
+
+# ----------------------------------------- FILE FORMAT -----------------------------------------|
+# 1. Magic bytes (4 bytes) followed by version (1 byte).                                         |
+# 2. Sequence of blocks, each encoding at most block_size bytes of input:                        |
+#       - number of tokens (8 bytes),                                                            |
+#       - four streams, each written as static_huff block (see static_huff.write_block):         |
+#           flags (bit per token, 1 for match) packed into bytes,                                |
+#           literals,                                                                            |
+#           match lengths minus MIN_MATCH as varints,                                            |
+#           match distances as varints.                                                          |
+# 3. Block with no tokens marks the end.                                                         |
+# Matches refer only to data within the same block.                                              |
+# ----------------------------------------- FILE FORMAT -----------------------------------------|
+MAGIC = b'\x89LZH'
+
+
+def compress_file(filename, save_to, block_size=BLOCK_SIZE):
+    with open(filename, "rb") as src, open(save_to, 'wb') as file:
+        file.write(MAGIC + bytes([1]))
+        while True:
+            data = src.read(block_size)
+            write_tokens(file, parse(data))
+            if not data:
+                break
+
+
+def decompress_file(filename, save_to):
+    with open(filename, "rb") as file, open(save_to, "wb") as out:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not an lz77 file.')
+        version = file.read(1)[0]
+        if version != 1:
+            raise ValueError(f'Unsupported file version: {version}')
+
+        while True:
+            tokens = read_tokens(file)
+            if not tokens:
+                break
+            out.write(unparse(tokens))
+
+
+def write_tokens(file, tokens):
+    flags = bitarray()
+    literals = bytearray()
+    lengths, distances = [], []
+    for token in tokens:
+        if isinstance(token, int):
+            flags.append(0)
+            literals.append(token)
+        else:
+            flags.append(1)
+            distance, length = token
+            lengths.append(length - MIN_MATCH)
+            distances.append(distance)
+
+    file.write(len(tokens).to_bytes(8, byteorder='big', signed=False))
+    if not tokens:
+        return
+    for stream in (flags.tobytes(), literals, to_varints(lengths), to_varints(distances)):
+        static_huff.write_block(file, bytes(stream))
+
+
+def read_tokens(file):
+    no_tokens = int.from_bytes(file.read(8), byteorder='big', signed=False)
+    if no_tokens == 0:
+        return []
+
+    flags = bitarray()
+    flags.frombytes(static_huff.read_block(file))
+    literals = iter(static_huff.read_block(file))
+    lengths = iter(from_varints(static_huff.read_block(file)))
+    distances = iter(from_varints(static_huff.read_block(file)))
+
+    return [(next(distances), next(lengths) + MIN_MATCH) if flag else next(literals)
+            for flag in flags[:no_tokens]]
+# -------------------------------------------- FILE ---------------------------------------------|
+
+
+def parse(data):
+    """
+        Greedy LZ77 parsing. Returns list of tokens: byte (int) for literal
+        or pair (distance, length) for match. Longest previous match at every
+        position comes from suffix array (see suffix_array.longest_previous_factor).
+    """
+    lengths, sources = suffix_array.longest_previous_factor(data)
+
+    tokens = []
+    i, n = 0, len(data)
+    while i < n:
+        length = lengths[i]
+        if length >= MIN_MATCH:
+            tokens.append((i - sources[i], length))
+            i += length
+        else:
+            tokens.append(data[i])
+            i += 1
+
+    return tokens
+
+
+def unparse(tokens):
+    """ Inverse of parse. """
+    out = bytearray()
+    for token in tokens:
+        if isinstance(token, int):
+            out.append(token)
+        else:
+            distance, length = token
+            start = len(out) - distance
+            if distance >= length:
+                out += out[start:start + length]
+            else:
+                # Overlapping match repeats its beginning.
+                for i in range(start, start + length):
+                    out.append(out[i])
+
+    return bytes(out)
+
+
+def encode(data):
+    """ Returns compressed bytes of a single block (without file header). """
+    buffer = BytesIO()
+    write_tokens(buffer, parse(data))
+
+    return buffer.getvalue()
+
+
+def decode(block):
+    return unparse(read_tokens(BytesIO(block)))
+
+
+def to_varints(values):
+    """ Little endian base 128, high bit of a byte means more bytes follow. """
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7f) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    return out
+
+
+def from_varints(data):
+    values = []
+    value, shift = 0, 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value, shift = 0, 0
+
+    return values
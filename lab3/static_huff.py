@@ -1,14 +1,432 @@
 from heapq import heappop, heappush
+from bisect import bisect_right
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from bitarray import bitarray
+import numpy as np
+
+# Number of bits consumed per lookup by the table-driven decoder.
+TABLE_BITS = 10
 
 
 # ----------------------------------------- FILE FORMAT -----------------------------------------|
+# Version 2 (default):                                                                           |
+# 1. Magic bytes (4 bytes) followed by version (1 byte).                                         |
+# 2. Number of encoded bytes (8 bytes).                                                          |
+# 3. Number of bits obtained from huffman encoding (8 bytes).                                    |
+# 4. Canonical code lengths over whole byte alphabet:                                            |
+#       - bitmap (32 bytes) of byte values present in input,                                     |
+#       - code length (1 byte) of every present byte value in increasing order.                  |
+# 5. Rest are bits obtained from huffman encoding.                                               |
+#                                                                                                |
+# Version 3 (streaming):                                                                         |
+# 1. Magic bytes (4 bytes) followed by version (1 byte).                                         |
+# 2. Sequence of blocks, each laid out as points 2-5 of version 2 and encoding                   |
+#    at most block_size bytes of input with its own code table.                                  |
+# 3. Empty block (no encoded bytes) marks the end.                                               |
+# 4. Block index: number of entries (8 bytes) followed by entries made of offset                 |
+#    in uncompressed data (8 bytes), offset of block in file (8 bytes) and offset                |
+#    in bits obtained from huffman encoding of that block (8 bytes).                             |
+#    Every block has entry with bit offset 0, blocks written with seek_every                     |
+#    also have entries for every seek_every bytes of input. Last entry points at empty block.    |
+# 5. Offset of block index in file (8 bytes).                                                    |
+#                                                                                                |
+# Version 1 (legacy, text only):                                                                 |
 # 1. Number of bits obtained from huffman encoding.                                              |
 # 2. Number of encoded characters.                                                               |
 # 3. Table: letter - (1 byte) => encoding's size (1 byte) => actual encoding (1/2/3... bytes)    |
 # 4. Rest are bits obtained from huffman encoding.                                               |
+#                                                                                                |
+# First byte of magic has its high bit set, version 1 files would need over 2^31 bits            |
+# to start with it and those could not be read back anyway (bit count is read as signed).        |
 # ----------------------------------------- FILE FORMAT -----------------------------------------|
-def compress_file(filename, save_to):
+MAGIC = b'\x89HUF'
+ALPHABET = 256
+BLOCK_SIZE = 1 << 20
+
+
+def compress_file(filename, save_to, version=2, block_size=None, workers=None, seek_every=None,
+                  max_length=None):
+    """
+        Version 3 is streaming, memory is then bounded by block_size (BLOCK_SIZE by default).
+        Passing block_size, workers or seek_every switches to version 3 as well.
+        Passing workers (number of processes) encodes blocks of version 3 in parallel.
+        Passing seek_every (in bytes) adds seek points inside blocks of version 3, see read_range.
+        Passing max_length limits length of codes (in bits), see limited_code_lengths.
+    """
+    if version not in (1, 2, 3):
+        raise ValueError(f'Unsupported file version: {version}')
+    if version == 1:
+        return compress_file_v1(filename, save_to)
+    if version == 3 or block_size is not None or workers is not None or seek_every is not None:
+        return compress_file_v3(filename, save_to, block_size or BLOCK_SIZE, workers, seek_every,
+                                max_length)
+
+    data = None
+    with open(filename, "rb") as file:
+        data = file.read()
+
+    with open(save_to, 'wb') as file:
+        file.write(MAGIC + bytes([2]))
+        write_block(file, data, max_length=max_length)
+
+
+def decompress_file(filename, save_to, workers=None):
+    """
+        Passing workers (number of processes) decodes blocks of version 3 in parallel.
+    """
+    with open(filename, "rb") as file:
+        head = file.read(4)
+        if head != MAGIC:
+            text = read_v1(file, int.from_bytes(
+                head, byteorder='big', signed=True))
+            with open(save_to, "w") as out:
+                out.write(text)
+            return
+
+        version = file.read(1)[0]
+        if version == 3:
+            return decompress_v3(file, save_to, workers)
+        if version != 2:
+            raise ValueError(f'Unsupported file version: {version}')
+
+        data = read_block(file)
+
+    with open(save_to, "wb") as file:
+        file.write(data)
+
+
+def compress_file_v3(filename, save_to, block_size=BLOCK_SIZE, workers=None, seek_every=None,
+                     max_length=None):
+    with open(filename, "rb") as src, open(save_to, 'wb') as file:
+        file.write(MAGIC + bytes([3]))
+
+        def chunks():
+            while True:
+                data = src.read(block_size)
+                if not data:
+                    break
+                yield data
+
+        index = []
+        offset = 0
+        encode = partial(encode_block, seek_every=seek_every, max_length=max_length)
+        for block, seeks in map_blocks(encode, chunks(), workers):
+            position = file.tell()
+            for i, bit in enumerate(seeks):
+                index.append((offset + i * (seek_every or 0), position, bit))
+            offset += int.from_bytes(block[:8], byteorder='big', signed=False)
+            file.write(block)
+
+        index.append((offset, file.tell(), 0))
+        write_block(file, b'')
+        write_index(file, index)
+
+
+def decompress_v3(file, save_to, workers=None):
+    with open(save_to, "wb") as out:
+        if workers is None:
+            while True:
+                data = read_block(file)
+                if not data:
+                    break
+                out.write(data)
+            return
+
+        starts = [position for _, position, bit in read_index(file) if bit == 0]
+
+        def blocks():
+            for start, end in zip(starts, starts[1:]):
+                file.seek(start)
+                yield file.read(end - start)
+
+        for data in map_blocks(decode_block, blocks(), workers):
+            out.write(data)
+
+
+def map_blocks(fn, blocks, workers=None):
+    """
+        Ordered map over blocks. With workers it runs in a process pool
+        keeping at most 2 * workers blocks in flight, so memory stays bounded.
+    """
+    if workers is None:
+        yield from map(fn, blocks)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for block in blocks:
+            pending.append(executor.submit(fn, block))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_index(file, index):
+    start = file.tell()
+    file.write(len(index).to_bytes(8, byteorder='big', signed=False))
+    for entry in index:
+        for value in entry:
+            file.write(value.to_bytes(8, byteorder='big', signed=False))
+    file.write(start.to_bytes(8, byteorder='big', signed=False))
+
+
+def read_index(file):
+    """
+        Returns list of (offset in uncompressed data, offset of block in file, offset in block's bits)
+        ending with entry for the empty block. Files without index are scanned block by block.
+    """
+    file.seek(-8, 2)
+    start = int.from_bytes(file.read(8), byteorder='big', signed=False)
+    if start == 0:
+        return scan_index(file)
+
+    file.seek(start)
+    count = int.from_bytes(file.read(8), byteorder='big', signed=False)
+    index = []
+    for _ in range(count):
+        entry = file.read(24)
+        index.append(tuple(int.from_bytes(entry[i:i + 8], byteorder='big', signed=False)
+                           for i in range(0, 24, 8)))
+
+    return index
+
+
+def scan_index(file):
+    """ Walks block headers skipping over lengths and bits. """
+    file.seek(len(MAGIC) + 1)
+    index = []
+    offset = 0
+    while True:
+        index.append((offset, file.tell(), 0))
+        no_symbols = int.from_bytes(file.read(8), byteorder='big', signed=False)
+        no_bits = int.from_bytes(file.read(8), byteorder='big', signed=False)
+        if no_symbols == 0:
+            return index
+
+        present = bitarray()
+        present.frombytes(file.read(ALPHABET // 8))
+        file.seek(present.count() + (no_bits + 7) // 8, 1)
+        offset += no_symbols
+
+
+def write_block(file, data, seek_every=None, max_length=None):
+    """
+        Writes bytes as: number of bytes, number of bits, code lengths, bits.
+        Returns offsets of bits at which every seek_every-th byte starts.
+    """
+    lengths = code_lengths(data, max_length)
+    codes = canonical_codes(lengths)
+
+    step = seek_every or max(len(data), 1)
+    seeks = []
+    bits = bitarray()
+    for start in range(0, len(data), step):
+        seeks.append(len(bits))
+        bits.encode(codes, data[start:start + step])
+
+    file.write(len(data).to_bytes(8, byteorder='big', signed=False))
+    file.write(len(bits).to_bytes(8, byteorder='big', signed=False))
+    write_lengths(file, lengths)
+    bits.tofile(file)
+
+    return seeks
+
+
+def encode_block(data, seek_every=None, max_length=None):
+    """ Same as write_block but returns bytes (and seeks), used by worker processes. """
+    buffer = BytesIO()
+    seeks = write_block(buffer, data, seek_every, max_length)
+
+    return buffer.getvalue(), seeks
+
+
+def decode_block(block):
+    """ Same as read_block but reads from bytes, used by worker processes. """
+    return read_block(BytesIO(block))
+
+
+def read_block(file):
+    """
+        Reads block written by write_block. Codes are rebuilt from lengths alone.
+    """
+    no_symbols, no_bits, lengths = read_header(file)
+
+    bits = bitarray()
+    bits.frombytes(file.read((no_bits + 7) // 8))
+    bits = bits[:no_bits]
+
+    out = bytearray(no_symbols)
+    if no_symbols:
+        table = lookup_table(canonical_codes(lengths))
+        table_decode(bits, table, out)
+
+    return bytes(out)
+
+
+def read_header(file):
+    no_symbols = int.from_bytes(file.read(8), byteorder='big', signed=False)
+    no_bits = int.from_bytes(file.read(8), byteorder='big', signed=False)
+
+    return no_symbols, no_bits, read_lengths(file)
+
+
+def read_range(filename, offset, length):
+    """
+        Returns length bytes of uncompressed data starting at offset (fewer if data ends earlier).
+        Only blocks covering the range are decoded, starting from the closest seek point.
+        Works with version 3 files, seek points come from compress_file(seek_every=...).
+    """
+    if offset < 0 or length < 0:
+        raise ValueError(f'Offset and length have to be non-negative, got {offset} and {length}.')
+
+    out = bytearray()
+    with open(filename, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC or file.read(1)[0] != 3:
+            raise ValueError('Random access needs version 3 file.')
+
+        index = read_index(file)
+        offsets = [entry[0] for entry in index]
+        starts = {position: raw for raw, position, bit in index if bit == 0}
+
+        i = bisect_right(offsets, offset) - 1
+        while length > 0 and i < len(index) - 1:
+            raw, position, bit = index[i]
+            file.seek(position)
+            no_symbols, no_bits, lengths = read_header(file)
+            payload = file.tell()
+
+            codes = canonical_codes(lengths)
+            skip = offset - raw
+            count = min(starts[position] + no_symbols - raw, skip + length)
+
+            # Read only as many bits as count symbols may take.
+            longest = max(len(code) for code in codes.values())
+            first = bit - bit % 8
+            file.seek(payload + first // 8)
+            bits = bitarray()
+            bits.frombytes(file.read((bit % 8 + count * longest + 7) // 8))
+            bits = bits[:no_bits - first]
+
+            decoded = bytearray(count)
+            table_decode(bits, lookup_table(codes), decoded, start=bit % 8)
+            out += decoded[skip:]
+
+            length -= count - skip
+            offset = raw + count
+            i = bisect_right(offsets, offset) - 1
+
+    return bytes(out)
+
+
+def write_lengths(file, lengths):
+    present = bitarray(size > 0 for size in lengths)
+    file.write(present.tobytes())
+    file.write(bytes(size for size in lengths if size))
+
+
+def read_lengths(file):
+    present = bitarray()
+    present.frombytes(file.read(ALPHABET // 8))
+    sizes = iter(file.read(present.count()))
+
+    return [next(sizes) if bit else 0 for bit in present]
+
+
+def code_lengths(data, max_length=None):
+    """
+        Returns list with huffman code length of every byte value.
+        With max_length no code is longer than max_length bits.
+    """
+    lengths = [0] * ALPHABET
+    if not data:
+        return lengths
+
+    if max_length is not None:
+        for letter, size in limited_code_lengths(count_frequencies(data), max_length).items():
+            lengths[letter] = size
+        return lengths
+
+    root = static_huffman(data)
+    if root.is_leaf():
+        # Lonely symbol still needs one bit.
+        lengths[root.letter] = 1
+        return lengths
+
+    for letter, code in bit_codes(root).items():
+        lengths[letter] = len(code)
+
+    return lengths
+
+
+def limited_code_lengths(counts, max_length):
+    """
+        Package-merge algorithm. Returns dict letter => code length,
+        lengths are optimal among codes not longer than max_length.
+    """
+    n = len(counts)
+    if n == 1:
+        return {letter: 1 for letter in counts}
+    if (1 << max_length) < n:
+        raise ValueError(f'{n} symbols do not fit in codes of {max_length} bits.')
+
+    # Item is (weight, letters it consists of).
+    leaves = sorted((count, [letter]) for letter, count in counts.items())
+    items = leaves
+    for _ in range(max_length - 1):
+        packages = [(items[i][0] + items[i + 1][0], items[i][1] + items[i + 1][1])
+                    for i in range(0, len(items) - 1, 2)]
+        items = sorted(leaves + packages, key=lambda item: item[0])
+
+    # Code length of letter is number of chosen items it takes part in.
+    lengths = {letter: 0 for letter in counts}
+    for _, letters in items[:2 * n - 2]:
+        for letter in letters:
+            lengths[letter] += 1
+
+    return lengths
+
+
+def length_limit_cost(data, max_length):
+    """
+        Compares size of encoding with unrestricted huffman codes and codes limited to max_length bits.
+        Returns dict with sizes in bits, longest codes and relative cost in percents.
+    """
+    counts = count_frequencies(data)
+    free = code_lengths(data)
+    limited = code_lengths(data, max_length)
+
+    free_bits = sum(count * free[letter] for letter, count in counts.items())
+    limited_bits = sum(count * limited[letter] for letter, count in counts.items())
+
+    return {
+        'bits': free_bits,
+        'limited_bits': limited_bits,
+        'longest': max(free),
+        'limited_longest': max(limited),
+        'cost [%]': (limited_bits - free_bits) / free_bits * 100 if free_bits else 0.0
+    }
+
+
+def canonical_codes(lengths):
+    """
+        Assigns canonical codes: shorter codes first, ties broken by symbol.
+    """
+    codes = {}
+    code, prev = 0, 0
+    for size, symbol in sorted((size, symbol) for symbol, size in enumerate(lengths) if size):
+        code <<= size - prev
+        codes[symbol] = bitarray(format(code, f'0{size}b'))
+        code, prev = code + 1, size
+
+    return codes
+
+
+def compress_file_v1(filename, save_to):
     text = None
     with open(filename, "r") as file:
         text = file.read()
@@ -32,35 +450,30 @@ def compress_file(filename, save_to):
         bits.tofile(file)
 
 
-def decompress_file(filename, save_to):
-    text = None
-    with open(filename, "rb") as file:
-        root = Node(-1)
-        no_bits = int.from_bytes(file.read(4), byteorder='big', signed=True)
-        no_chars = int.from_bytes(file.read(4), byteorder='big', signed=True)
+def read_v1(file, no_bits):
+    root = Node(-1)
+    no_chars = int.from_bytes(file.read(4), byteorder='big', signed=True)
 
-        for _ in range(no_chars):
-            letter_bits = bitarray()
-            letter_bits.fromfile(file, 1)
-            letter = letter_bits.tobytes().decode()
+    for _ in range(no_chars):
+        letter_bits = bitarray()
+        letter_bits.fromfile(file, 1)
+        letter = letter_bits.tobytes().decode()
 
-            enc_size = int.from_bytes(
-                file.read(1), byteorder='big', signed=True)
+        enc_size = int.from_bytes(
+            file.read(1), byteorder='big', signed=True)
 
-            bytes_to_read = ((enc_size - 1) // 8) + 1
-            code = bitarray()
-            code.fromfile(file, bytes_to_read)
-            code = code[:enc_size]
+        bytes_to_read = ((enc_size - 1) // 8) + 1
+        code = bitarray()
+        code.fromfile(file, bytes_to_read)
+        code = code[:enc_size]
 
-            appendLeaf(root, code, letter)
+        appendLeaf(root, code, letter)
 
-        bits = bitarray()
-        bits.fromfile(file)
-        bits = bits[:no_bits]
-        text = decode(bits, root)
+    bits = bitarray()
+    bits.fromfile(file)
+    bits = bits[:no_bits]
 
-    with open(save_to, "w") as file:
-        file.write(text)
+    return decode_fast(bits, root)
 
 
 # When decoding we reconstruct huffman tree.
@@ -106,13 +519,15 @@ def encode(text, root=None):
 
     codes = bit_codes(root)
     encoded = bitarray()
-    for letter in text:
-        encoded += codes[letter]
+    encoded.encode(codes, text)
 
     return encoded, root
 
 
 def decode(bits, root):
+    if root.is_leaf():
+        return root.letter * len(bits)
+
     decoded = ''
     current = root
     for bit in bits:
@@ -128,6 +543,90 @@ def decode(bits, root):
     return decoded
 
 
+def decode_fast(bits, root, k=TABLE_BITS):
+    """
+        Table-driven counterpart of decode which consumes k bits per lookup.
+        Result is the same, decode is kept as reference implementation.
+    """
+    if root.is_leaf():
+        # Lonely symbol has one bit code (see bit_codes), empty tree decodes nothing.
+        return root.letter * len(bits) if root.letter is not None else ''
+
+    codes = bit_codes(root)
+    table = lookup_table(codes, k)
+
+    # Every symbol takes at least min_len bits so this bounds the output.
+    min_len = min(len(code) for code in codes.values())
+    out = [None] * (len(bits) // min_len)
+    n = table_decode(bits, table, out, k)
+
+    return ''.join(out[:n])
+
+
+def lookup_table(codes, k=TABLE_BITS):
+    """
+        Builds lookup table indexed by next k bits of input.
+        Entries are pairs:
+            - (letter, code length) when whole code fits in k bits,
+            - (None, subtable) for longer codes, subtable is indexed by following k bits.
+    """
+    table = [None] * (1 << k)
+    longer = {}
+    for letter, code in codes.items():
+        size = len(code)
+        if size <= k:
+            start = int(code.to01(), 2) << (k - size) if size else 0
+            for i in range(start, start + (1 << (k - size))):
+                table[i] = (letter, size)
+        else:
+            prefix = int(code[:k].to01(), 2)
+            if prefix not in longer:
+                longer[prefix] = {}
+            longer[prefix][letter] = code[k:]
+
+    for prefix, suffixes in longer.items():
+        table[prefix] = (None, lookup_table(suffixes, k))
+
+    return table
+
+
+def table_decode(bits, table, out, k=TABLE_BITS, start=0):
+    """
+        Decodes bits beginning at bit start into preallocated out (list or bytearray)
+        until either out is full or bits are exhausted.
+        Returns number of decoded symbols.
+    """
+    if k > 16:
+        raise ValueError('Lookup tables wider than 16 bits are not supported.')
+
+    no_bits = len(bits)
+    # Three bytes of padding, so that window never reaches past data.
+    data = bits.tobytes() + bytes(3)
+    mask = (1 << k) - 1
+    shift = 24 - k
+
+    pos, n, size = start, 0, len(out)
+    while pos < no_bits and n < size:
+        current = table
+        while True:
+            b = pos >> 3
+            window = (data[b] << 16) | (data[b + 1] << 8) | data[b + 2]
+            letter, step = current[(window >> (shift - (pos & 7))) & mask]
+            if letter is None:
+                current = step
+                pos += k
+            else:
+                pos += step
+                break
+
+        if pos > no_bits:
+            break
+        out[n] = letter
+        n += 1
+
+    return n
+
+
 # ------------------ Utilties ----------------------
 class Node:
     def __init__(self, v, leftKid=None, rightKid=None, letter=None):
@@ -135,7 +634,7 @@ class Node:
         self.parent = None
         self.v = v
 
-        if letter:
+        if letter is not None:
             self.letter = letter
 
     def is_leaf(self):
@@ -165,6 +664,11 @@ class Node:
 
 
 def count_frequencies(text):
+    if isinstance(text, (bytes, bytearray)):
+        # Fast path, counting is done by numpy.
+        counts = np.bincount(np.frombuffer(text, dtype=np.uint8), minlength=ALPHABET)
+        return {letter: int(count) for letter, count in enumerate(counts) if count}
+
     counts = {}
     for letter in text:
         if letter in counts:
@@ -176,6 +680,10 @@ def count_frequencies(text):
 
 
 def bit_codes(root):
+    if root.is_leaf():
+        # Lonely symbol still needs one bit.
+        return {root.letter: bitarray('0')}
+
     codes = {}
     bit_codes_util(root, '', codes)
 
@@ -186,5 +694,8 @@ def bit_codes_util(node, prev, codes):
     if node.is_leaf():
         codes[node.letter] = bitarray(prev)
     else:
-        bit_codes_util(node.leftKid, prev + '0', codes)
-        bit_codes_util(node.rightKid, prev + '1', codes)
+        # Tree read from file for a lonely symbol has only one kid.
+        if node.leftKid is not None:
+            bit_codes_util(node.leftKid, prev + '0', codes)
+        if node.rightKid is not None:
+            bit_codes_util(node.rightKid, prev + '1', codes)
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def suffix_array(data):
+    """
+        Returns suffix array (numpy array of positions) of bytes data.
+        Uses prefix doubling: in every round suffixes are sorted by pair
+        (rank of first 2^k bytes, rank of next 2^k bytes), sorting is done by numpy.
+    """
+    n = len(data)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Ranks have to be dense (below n) for keys below to be unique.
+    _, rank = np.unique(np.frombuffer(bytes(data), dtype=np.uint8), return_inverse=True)
+    rank = rank.astype(np.int64)
+    k = 1
+    while True:
+        # Suffixes shorter than k + 1 get -1, so they go first.
+        second = np.full(n, -1, dtype=np.int64)
+        second[:n - k] = rank[k:]
+        key = rank * (n + 1) + (second + 1)
+
+        sa = np.argsort(key, kind='stable')
+        sorted_key = key[sa]
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[sa] = np.concatenate(([0], np.cumsum(sorted_key[1:] != sorted_key[:-1])))
+        rank = new_rank
+
+        if rank[sa[-1]] == n - 1 or k >= n:
+            return sa
+        k *= 2
+
+
+def longest_previous_factor(data, sa=None):
+    """
+        For every position i returns pair of lists (lengths, sources) where lengths[i]
+        is length of longest prefix of data[i:] which also starts at some position
+        sources[i] < i (-1 if there is none). Matches may overlap position i.
+
+        Candidates are the closest suffixes in suffix array order which start earlier in text
+        (previous/next smaller value of positions). Their common prefixes with data[i:]
+        shrink by at most one when moving to i + 1, so total work is linear.
+    """
+    n = len(data)
+    if sa is None:
+        sa = suffix_array(data)
+    sa = sa.tolist()
+
+    prev_smaller = [-1] * n
+    next_smaller = [-1] * n
+    stack = []
+    for i in sa:
+        while stack and stack[-1] > i:
+            next_smaller[stack.pop()] = i
+        if stack:
+            prev_smaller[i] = stack[-1]
+        stack.append(i)
+
+    lengths = [0] * n
+    sources = [-1] * n
+    lp = ln = 0
+    for i in range(n):
+        j = prev_smaller[i]
+        if j < 0:
+            lp = 0
+        else:
+            while i + lp < n and data[j + lp] == data[i + lp]:
+                lp += 1
+
+        j = next_smaller[i]
+        if j < 0:
+            ln = 0
+        else:
+            while i + ln < n and data[j + ln] == data[i + ln]:
+                ln += 1
+
+        if lp >= ln:
+            lengths[i], sources[i] = lp, prev_smaller[i]
+        else:
+            lengths[i], sources[i] = ln, next_smaller[i]
+
+        lp, ln = max(lp - 1, 0), max(ln - 1, 0)
+
+    return lengths, sources
@@ -11,6 +11,10 @@ def delta(a, b):
         return 1
 
 
+# Default delta, tables for it need no substitution costs matrix.
+unit_delta = delta
+
+
 def edit_distance(x, y, delta=delta, dp=None):
     """
         Returns edit distance between word x and word y.
@@ -18,12 +22,311 @@ def edit_distance(x, y, delta=delta, dp=None):
     if dp is None:
         dp = edit_table(x, y, delta)
 
-    return dp[len(x), len(y)]
+    return dp[len(x), len(y)].item()
+
+
+# Words up to that long are compared with bit-vectors, which then fit in a machine word.
+WORD_BITS = 64
+
+
+def edit_distance_bounded(x, y, k):
+    """
+        Returns edit distance (unit costs) between x and y if it is at most k, otherwise k + 1,
+        which is returned as soon as distance has to exceed k.
+
+        Short words (up to WORD_BITS) go to bit_vector_distance, which is O(n),
+        longer ones to band_distance, which is O(k * k) plus comparing slices along diagonals,
+        O(k * n) at worst.
+    """
+    if len(x) > len(y):
+        x, y = y, x
+    m, n = len(x), len(y)
+    if n - m > k:
+        return k + 1
+    if m == 0:
+        return n
+
+    if m <= WORD_BITS:
+        return bit_vector_distance(x, y, k)
+    return band_distance(x, y, k)
+
+
+def band_distance(x, y, k):
+    """
+        edit_distance_bounded for len(x) <= len(y) computing only diagonals of the table within k
+        of the main one (Ukkonen's band). For every number of edits d, furthest[diagonal] is the
+        last row reachable with d edits on that diagonal (Landau-Vishkin), every step
+        is followed by sliding along equal letters, which compares whole slices at once.
+    """
+    m, n = len(x), len(y)
+    target = n - m
+    # Diagonal j - i is at index diagonal + k + 1, outer entries stay unreachable.
+    unreachable = -(n + 2)
+    furthest = [unreachable] * (2 * k + 3)
+
+    furthest[k + 1] = common_prefix_length(x, 0, y, 0)
+    for d in range(k + 1):
+        if d:
+            previous = furthest
+            furthest = [unreachable] * (2 * k + 3)
+            for diagonal in range(max(-d, target - k), min(d, target + k) + 1):
+                t = diagonal + k + 1
+                # Replace, insert (from diagonal - 1 in the same row), delete (from diagonal + 1).
+                i = max(previous[t] + 1, previous[t - 1], previous[t + 1] + 1)
+                i = min(i, m, n - diagonal)
+                if i < max(0, -diagonal):
+                    continue
+                furthest[t] = i + common_prefix_length(x, i, y, i + diagonal)
+
+        if furthest[target + k + 1] >= m:
+            return d
+
+    return k + 1
+
+
+def common_prefix_length(x, i, y, j):
+    """
+        Returns length of common prefix of x[i:] and y[j:], comparing slices of doubling length.
+    """
+    n = min(len(x) - i, len(y) - j)
+    length, step = 0, 1
+    while length < n:
+        size = min(step, n - length)
+        if x[i + length:i + length + size] == y[j + length:j + length + size]:
+            length, step = length + size, step * 2
+        elif size == 1:
+            break
+        else:
+            step = size // 2
+
+    return length
+
+
+def bit_vector_distance(x, y, k):
+    """
+        edit_distance_bounded for 0 < len(x) <= len(y) using Myers' bit-vector algorithm:
+        column of the table (along x) is kept as bits of Python ints marking +1 and -1 differences
+        between neighbouring cells, next column takes few operations on whole ints.
+        Values never decrease along diagonals, so once cell on the diagonal of the last cell
+        exceeds k, so does the distance.
+    """
+    m, n = len(x), len(y)
+
+    # Bit i of matches[c] is set when x[i] == c.
+    matches = {}
+    for i, c in enumerate(x):
+        matches[c] = matches.get(c, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    plus, minus = mask, 0
+    score = m
+    for j, c in enumerate(y, 1):
+        eq = matches.get(c, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        plus_h = minus | ~(xh | plus)
+        minus_h = plus & xh
+        if plus_h & last:
+            score = score + 1
+        elif minus_h & last:
+            score = score - 1
+
+        # First row of the table grows by one in every column.
+        plus_h = (plus_h << 1) | 1
+        minus_h = minus_h << 1
+        plus = (minus_h | ~(xv | plus_h)) & mask
+        minus = plus_h & xv & mask
+
+        i = j + m - n
+        if i >= 0:
+            below = (1 << i) - 1
+            diagonal = j + bin(plus & below).count('1') - bin(minus & below).count('1')
+            if diagonal > k:
+                return k + 1
+
+    return score
+
+
+def approximate_search(pattern, text, k):
+    """
+        Yields pairs (end_position, distance) for every position of text where some substring ending there
+        is within edit distance k (unit costs) of pattern. This is edit table with free first row
+        (Sellers), so match can start anywhere. Text may be any iterable of letters, e.g. generator
+        reading a file, it is read once and never kept.
+    """
+    if 0 < len(pattern) <= WORD_BITS:
+        yield from bit_vector_search(pattern, text, k)
+    else:
+        yield from cut_off_search(pattern, text, k)
+
+
+def bit_vector_search(pattern, text, k):
+    """
+        approximate_search with column of the table kept as bit-vectors (see edit_distance_bounded),
+        first row is zero, so nothing is shifted in.
+    """
+    m = len(pattern)
+    matches = {}
+    for i, c in enumerate(pattern):
+        matches[c] = matches.get(c, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    plus, minus = mask, 0
+    score = m
+    for j, c in enumerate(text):
+        eq = matches.get(c, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        plus_h = minus | ~(xh | plus)
+        minus_h = plus & xh
+        if plus_h & last:
+            score = score + 1
+        elif minus_h & last:
+            score = score - 1
+
+        plus_h = plus_h << 1
+        minus_h = minus_h << 1
+        plus = (minus_h | ~(xv | plus_h)) & mask
+        minus = plus_h & xv & mask
+
+        if score <= k:
+            yield j, score
+
+
+def cut_off_search(pattern, text, k):
+    """
+        approximate_search computing column of the table only down to the last cell
+        not exceeding k (Ukkonen's cut-off), cells below it cannot lead to a match.
+    """
+    m = len(pattern)
+    column = list(range(m + 1))
+    active = min(k + 1, m)
+    for j, c in enumerate(text):
+        diagonal, above = 0, 0
+        for i in range(1, active + 1):
+            if pattern[i - 1] == c:
+                value = diagonal
+            else:
+                value = 1 + min(diagonal, above, column[i])
+            diagonal, column[i], above = column[i], value, value
+
+        while column[active] > k:
+            active = active - 1
+        if active == m:
+            yield j, column[m]
+        else:
+            active = active + 1
+
+
+def edit_table(x, y, delta=delta, costs=None, alphabet=None):
+    """
+        Returns table constructed via dynamic algorithm (see edit_table_diagonal).
+        Delta is called once for every pair of letters to build substitution costs matrix,
+        which can also be passed directly as costs together with its alphabet.
+    """
+    if costs is None and delta is not unit_delta:
+        alphabet = letters(x, y)
+        costs = substitution_matrix(alphabet, delta)
+
+    return edit_table_diagonal(x, y, costs, alphabet)
+
+
+def letters(x, y):
+    """
+        Returns list of distinct letters of x and y in order of appearance.
+    """
+    return list(dict.fromkeys(list(x) + list(y)))
+
+
+def substitution_matrix(alphabet, delta=delta):
+    """
+        Returns matrix with costs[a, b] = delta(alphabet[a], alphabet[b]).
+    """
+    costs = np.array([[delta(a, b) for b in alphabet] for a in alphabet]).reshape(len(alphabet), len(alphabet))
+    if costs.dtype.kind not in 'iu':
+        costs = costs.astype(np.float64)
+
+    return costs
+
+
+def edit_table_diagonal(x, y, costs=None, alphabet=None):
+    """
+        Same table as edit_table_naive, cells of one anti-diagonal depend only on
+        two previous anti-diagonals, so every anti-diagonal is computed by numpy at once.
+        In flattened table anti-diagonal is a slice with step n, so no copies are made.
+
+        costs - substitution costs matrix indexed by positions of letters in alphabet,
+        when None replacing costs 1 and keeping costs 0.
+        alphabet - defaults to letters(x, y), i.e. letters in order of appearance.
+        Table uses int32 (int64 for very long words, float64 for fractional costs).
+    """
+    if costs is None or alphabet is None:
+        alphabet = letters(x, y)
+    if costs is None:
+        highest = 1
+    else:
+        costs = np.asarray(costs)
+        if costs.size == 0:
+            costs = costs.reshape(0, 0)
+        if costs.ndim != 2 or costs.shape[0] < len(alphabet) or costs.shape[1] < len(alphabet):
+            raise ValueError(f'Costs must be a matrix covering {len(alphabet)} letters, got shape {costs.shape}.')
+        highest = max(1, costs.max()) if costs.size else 1
+
+    index = {letter: i for i, letter in enumerate(alphabet)}
+    xs = np.array([index[letter] for letter in x], dtype=np.int64)
+    ys = np.array([index[letter] for letter in y], dtype=np.int64)
+
+    return code_table(xs, ys, costs, highest)
+
+
+def code_table(xs, ys, costs=None, highest=1):
+    """
+        edit_table_diagonal for arrays of letter codes (positions in alphabet),
+        highest - largest substitution cost, used to pick dtype.
+    """
+    m, n = len(xs), len(ys)
+    ys = ys[::-1]
+
+    dtype = np.float64
+    if costs is None or costs.dtype.kind in 'iu':
+        bound = (m + n) * highest
+        dtype = np.int32 if bound < 2 ** 31 else np.int64
+        if costs is not None:
+            costs = costs.astype(dtype)
+
+    dp = np.empty((m + 1, n + 1), dtype=dtype)
+    dp[:, 0] = np.arange(m + 1)
+    dp[0] = np.arange(n + 1)
+    if m == 0 or n == 0:
+        return dp
+
+    flat = dp.ravel()
+    for d in range(2, m + n + 1):
+        # Cells (j, d - j) for j in [lo, hi].
+        lo, hi = max(1, d - n), min(m, d - 1)
+        start, stop = lo * n + d, hi * n + d + 1
+        up = flat[start - n - 1:stop - n - 1:n]
+        left = flat[start - 1:stop - 1:n]
+        diagonal = flat[start - n - 2:stop - n - 2:n]
+
+        a = xs[lo - 1:hi]
+        b = ys[n - d + lo:n - d + hi + 1]
+        if costs is None:
+            replace = diagonal + (a != b)
+        else:
+            replace = diagonal + costs[a, b]
 
+        flat[start:stop:n] = np.minimum(np.minimum(up, left) + 1, replace)
 
-def edit_table(x, y, delta=delta):
+    return dp
+
+
+def edit_table_naive(x, y, delta=delta):
     """
-        Returns table constructed via dynamic algorithm.
+        Returns table constructed via dynamic algorithm, cell by cell.
+        Kept as reference for edit_table.
     """
     m, n = len(x), len(y)
     dp = np.empty((m + 1, n + 1))
@@ -59,20 +362,31 @@ def edit_sequence(x, y, delta=delta):
     """
         Returns one of possibly many minimal edit sequences.
     """
-    dp = edit_table(x, y, delta)
-    m, n = len(x), len(y)
+    return backtrack(edit_table(x, y, delta), x, y, delta)
+
+
+def backtrack(dp, x, y, delta=delta):
+    """
+        Returns edit sequence read from filled edit table of x and y.
+    """
+    m, n = dp.shape[0] - 1, dp.shape[1] - 1
 
     ptr = [[1, 0], [0, 1], [1, 1]]
     seq = []
     moves = np.empty(3)
+    steps = np.ones(3)
     j, i = m, n
     while i != 0 and j != 0:
         for k in range(3):
             moves[k] = dp[j - ptr[k][1], i - ptr[k][0]]
+        steps[EditOperation.REPLACE.value] = delta(x[j - 1], y[i - 1])
 
         k = np.argmin(moves)
         if moves[EditOperation.REPLACE.value] == moves[k]:
             k = EditOperation.REPLACE.value
+        # With costs other than 0 and 1 smallest neighbour need not lie on minimal path.
+        if moves[k] + steps[k] != dp[j, i]:
+            k = next(k for k in (2, 0, 1) if moves[k] + steps[k] == dp[j, i])
         j, i = j - ptr[k][1], i - ptr[k][0]
 
         seq.append(EditOperation(k))
@@ -89,6 +403,73 @@ def edit_sequence(x, y, delta=delta):
     return seq
 
 
+def edit_sequence_linear(x, y, delta=delta):
+    """
+        Returns minimal edit sequence as edit_sequence does, but in O(m + n) memory
+        (Hirschberg's divide and conquer). x is split in half, last rows for the first half
+        and for reversed second half (see last_row) show where an optimal path crosses
+        the middle, then both parts are solved recursively. Small parts get a full table.
+        Sequence may differ from edit_sequence when there are many minimal ones.
+    """
+    alphabet = letters(x, y)
+    costs, highest = None, 1
+    if delta is not unit_delta:
+        costs = substitution_matrix(alphabet, delta)
+        highest = max(1, costs.max()) if costs.size else 1
+
+    index = {letter: i for i, letter in enumerate(alphabet)}
+    xs = np.array([index[letter] for letter in x], dtype=np.int64)
+    ys = np.array([index[letter] for letter in y], dtype=np.int64)
+
+    seq = []
+    hirschberg(xs, ys, costs, highest, seq)
+    return seq
+
+
+# Parts with at most that many cells are solved with full table.
+HIRSCHBERG_CELLS = 1 << 16
+
+
+def hirschberg(xs, ys, costs, highest, seq):
+    m, n = len(xs), len(ys)
+    if m < 2 or n < 2 or m * n <= HIRSCHBERG_CELLS:
+        step = delta if costs is None else lambda a, b: costs[a, b]
+        seq.extend(backtrack(code_table(xs, ys, costs, highest), xs, ys, step))
+        return
+
+    mid = m // 2
+    left = last_row(xs[:mid], ys, costs)
+    right = last_row(xs[mid:][::-1], ys[::-1], costs)[::-1]
+    k = int(np.argmin(left + right))
+
+    hirschberg(xs[:mid], ys[:k], costs, highest, seq)
+    hirschberg(xs[mid:], ys[k:], costs, highest, seq)
+
+
+def last_row(xs, ys, costs=None):
+    """
+        Returns last row of code_table keeping only two rows at a time.
+        Deletions and replacements come from previous row for whole row at once,
+        insertions chain along the row: row[i] = min(t[i], row[i - 1] + 1),
+        which is running minimum of t[i] - i shifted back by i.
+    """
+    n = len(ys)
+    dtype = np.int64 if costs is None or costs.dtype.kind in 'iu' else np.float64
+    shift = np.arange(n + 1, dtype=dtype)
+    row = shift.copy()
+    t = np.empty(n + 1, dtype=dtype)
+    for j, a in enumerate(xs, 1):
+        if costs is None:
+            replace = row[:-1] + (ys != a)
+        else:
+            replace = row[:-1] + costs[a, ys]
+        t[0] = j
+        np.minimum(row[1:] + 1, replace, out=t[1:])
+        row = np.minimum.accumulate(t - shift) + shift
+
+    return row
+
+
 def visualize(x, y, delta=delta, sleep_for=.9):
     """
        This function triggers text animation which
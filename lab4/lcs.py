@@ -1,4 +1,10 @@
+import hashlib
+import mmap
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left
+from collections import Counter
 import numpy as np
 
 
@@ -52,7 +58,62 @@ def lcs(x, y, dp=None, join=False):
     return "".join(seq)
 
 
-def diff_files(original, new):
+def lcs_linear(x, y, join=False):
+    """
+        Returns longest common subsequence as lcs does, but in O(m + n) memory
+        (Hirschberg's divide and conquer, see lcs_row). Elements have to be hashable.
+    """
+    ids = {}
+    xs = np.array([ids.setdefault(e, len(ids)) for e in x], dtype=np.int64)
+    ys = np.array([ids.setdefault(e, len(ids)) for e in y], dtype=np.int64)
+
+    positions = []
+    hirschberg(xs, ys, 0, positions)
+    seq = [x[j] for j in positions]
+
+    if not join:
+        return seq
+    return "".join(seq)
+
+
+def hirschberg(xs, ys, start, positions):
+    """
+        Appends to positions indices (shifted by start) of elements of xs forming lcs with ys.
+        xs is split in half, last rows for the first half and for reversed second half
+        show where lcs crosses the middle, then both parts are solved recursively.
+    """
+    m = len(xs)
+    if m == 0 or len(ys) == 0:
+        return
+    if m == 1:
+        if (ys == xs[0]).any():
+            positions.append(start)
+        return
+
+    mid = m // 2
+    left = lcs_row(xs[:mid], ys)
+    right = lcs_row(xs[mid:][::-1], ys[::-1])[::-1]
+    k = int(np.argmax(left + right))
+
+    hirschberg(xs[:mid], ys[:k], start, positions)
+    hirschberg(xs[mid:], ys[k:], start + mid, positions)
+
+
+def lcs_row(xs, ys):
+    """
+        Returns last row of lcs_table for integer arrays xs and ys keeping only two rows at a time.
+        Values never decrease along a row, so taking max with left neighbour is running maximum.
+    """
+    row = np.zeros(len(ys) + 1, dtype=np.int64)
+    t = np.zeros_like(row)
+    for a in xs:
+        np.maximum(row[1:], row[:-1] + (ys == a), out=t[1:])
+        row = np.maximum.accumulate(t)
+
+    return row
+
+
+def diff_files(original, new, engine='myers'):
     x, y = None, None
     with open(original, "r", encoding='UTF-8') as file:
         x = file.read().splitlines()
@@ -60,14 +121,188 @@ def diff_files(original, new):
     with open(new, "r", encoding='UTF-8') as file:
         y = file.read().splitlines()
 
-    print(diff(x, y))
+    print(diff(x, y, engine))
+
+
+def diff_files_mmap(original, new, engine='myers', out=None):
+    """
+        Equivalent diff to diff_files in the same format, but files are
+        memory mapped and hunks are written to out (stdout by default) as they come (see mmap_diff),
+        so memory depends only on changed region. Output need not be identical: common prefix
+        and suffix are trimmed at byte level, which may align different ones of equal lines,
+        and lines are split on '\\n' only (trailing '\\r' is dropped) instead of splitlines.
+        Used from command line with --mmap flag.
+    """
+    out = out or sys.stdout
+    for lines in mmap_diff(original, new, engine):
+        out.write(lines)
+    out.write('\n')
+
+
+def mmap_diff(original, new, engine='myers'):
+    """
+        Generator of diff output for two files. Common prefix and suffix are skipped comparing bytes
+        of memory mapped files, only lines in between are indexed by offsets and hashes
+        and paired by engine (see diff).
+    """
+    with open(original, 'rb') as file_a, open(new, 'rb') as file_b:
+        a, b = map_file(file_a), map_file(file_b)
+        prefix = common_prefix(a, b)
+        prefix = a.rfind(b'\n', 0, prefix) + 1
+        suffix = common_suffix(a, b, prefix)
+
+        first = count_lines(a, prefix)
+        x = MappedLines(a, prefix, len(a) - suffix, first)
+        y = MappedLines(b, prefix, len(b) - suffix, first)
+
+        j, i = first, first
+        pairs = ENGINES[engine](x.hashes, y.hashes)
+        for next_j, next_i in pairs + [(len(x.hashes), len(y.hashes))]:
+            next_j, next_i = next_j + first, next_i + first
+            lines = hunk(x, y, j, next_j, i, next_i)
+            if lines:
+                yield ''.join(lines)
+            j, i = next_j + 1, next_i + 1
+
+
+def map_file(file):
+    # Empty files cannot be mapped.
+    if not file.seek(0, 2):
+        return b''
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# Bytes compared at once when looking for common prefix and suffix.
+CHUNK = 1 << 20
+
+
+def common_prefix(a, b):
+    n = min(len(a), len(b))
+    for start in range(0, n, CHUNK):
+        stop = min(start + CHUNK, n)
+        chunk_a, chunk_b = a[start:stop], b[start:stop]
+        if chunk_a != chunk_b:
+            differ = np.frombuffer(chunk_a, dtype=np.uint8) != np.frombuffer(chunk_b, dtype=np.uint8)
+            return start + int(np.argmax(differ))
+
+    return n
+
+
+def common_suffix(a, b, prefix):
+    """
+        Returns length of common suffix of a[prefix:] and b[prefix:] starting at line start in both.
+    """
+    n = min(len(a), len(b)) - prefix
+    suffix = n
+    for start in range(0, n, CHUNK):
+        stop = min(start + CHUNK, n)
+        chunk_a, chunk_b = a[len(a) - stop:len(a) - start], b[len(b) - stop:len(b) - start]
+        if chunk_a != chunk_b:
+            differ = np.frombuffer(chunk_a, dtype=np.uint8)[::-1] != np.frombuffer(chunk_b, dtype=np.uint8)[::-1]
+            suffix = start + int(np.argmax(differ))
+            break
+
+    start_a, start_b = len(a) - suffix, len(b) - suffix
+    if (start_a == prefix or a[start_a - 1] == 10) and (start_b == prefix or b[start_b - 1] == 10):
+        return suffix
+
+    # Suffix has to begin right after the same newline in both.
+    newline = a.find(b'\n', start_a)
+    return len(a) - newline - 1 if newline != -1 else 0
+
+
+def count_lines(buffer, stop):
+    return sum(buffer[start:min(start + CHUNK, stop)].count(b'\n') for start in range(0, stop, CHUNK))
+
+
+class MappedLines:
+    """
+        Lines of buffer[start:stop] kept as offsets and hashes, numbered from first.
+        Slicing returns decoded lines.
+    """
+
+    def __init__(self, buffer, start, stop, first):
+        self.buffer = buffer
+        self.first = first
+        self.starts, self.ends, self.hashes = [], [], []
+        while start < stop:
+            end = buffer.find(b'\n', start, stop)
+            if end == -1:
+                end = stop
+            self.starts.append(start)
+            self.ends.append(end)
+            self.hashes.append(hash(buffer[start:end]))
+            start = end + 1
+
+    def __getitem__(self, key):
+        start, stop = key.start - self.first, key.stop - self.first
+        return [self.buffer[self.starts[k]:self.ends[k]].decode('UTF-8').rstrip('\r')
+                for k in range(start, stop)]
+
+
+def diff_trees(original, new, engine='myers', workers=None, out=None):
+    """
+        Diffs files with the same relative path in two directory trees, output is ordered by path.
+        Files with equal size and hash are skipped, the rest is diffed (see mmap_diff)
+        by a pool of workers processes (all cpus by default).
+    """
+    out = out or sys.stdout
+    files_a, files_b = tree_files(original), tree_files(new)
+
+    paths = sorted(files_a | files_b)
+    common = [path for path in paths if path in files_a and path in files_b]
+    originals = [os.path.join(original, path) for path in common]
+    news = [os.path.join(new, path) for path in common]
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(common) // (4 * workers))
+    with ProcessPoolExecutor(workers) as executor:
+        # Results come in order of common, which follows paths.
+        results = zip(originals, news, executor.map(diff_pair, originals, news, [engine] * len(common),
+                                                    chunksize=chunksize))
+        for path in paths:
+            if path not in files_b:
+                out.write(f'{ANSI.BLUE}Only in {original}: {path}{ANSI.STOP}\n')
+            elif path not in files_a:
+                out.write(f'{ANSI.BLUE}Only in {new}: {path}{ANSI.STOP}\n')
+            else:
+                path_a, path_b, lines = next(results)
+                if lines:
+                    out.write(f'{ANSI.BLUE}@@ Diff {path_a} {path_b} @@{ANSI.STOP}\n')
+                    out.write(lines + '\n')
+
+
+def tree_files(root):
+    """ Returns set of paths of all files under root, relative to it. """
+    return {os.path.relpath(os.path.join(directory, name), root)
+            for directory, _, names in os.walk(root) for name in names}
+
+
+def diff_pair(original, new, engine='myers'):
+    """
+        Returns diff output for two files, empty when their contents are equal.
+        Files which are not UTF-8 text are only reported as different.
+    """
+    if os.path.getsize(original) == os.path.getsize(new) and file_hash(original) == file_hash(new):
+        return ''
+    try:
+        return ''.join(mmap_diff(original, new, engine))
+    except UnicodeDecodeError:
+        return f'Binary files {original} and {new} differ'
+
+
+def file_hash(filename):
+    digest = hashlib.blake2b()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK), b''):
+            digest.update(chunk)
+
+    return digest.digest()
 
 
 def lcs_length_files(original, new):
     """
-        Prints length of lcs for given files. Note that here I could have provided more memory efficient solution,
-        since I don't need whole table (which is needed when reconstructing lcs and I only care about length)
-        but it works for the assignment so I am keeping it that way ;)
+        Prints length of lcs for given files (see lcs_length, no table is built).
     """
     x, y = None, None
     with open(original, "r", encoding='UTF-8') as file:
@@ -76,85 +311,284 @@ def lcs_length_files(original, new):
     with open(new, "r", encoding='UTF-8') as file:
         y = file.read()
 
-    lcs_len = len(lcs(x, y, join=True))
+    lcs_len = lcs_length(x, y)
     print(
         f'Length of longest common subsequence for {original} with {len(x)} characters and {new} with {len(y)} characters is {lcs_len}')
 
 
-def diff(x, y):
+def lcs_length(x, y):
+    """
+        Returns length of lcs of x and y in O(m + n) memory (bit-parallel algorithm of Allison-Dix and Hyyro).
+        Row of lcs_table is kept as bits of one Python int: bit i is 0 when value grows at column i + 1.
+        Next row takes few operations on whole ints, which Python does 30-64 bits (columns) at a time.
+        Elements have to be hashable.
+    """
+    if len(x) > len(y):
+        x, y = y, x
+    n = len(y)
+
+    positions = {}
+    for i, e in enumerate(y):
+        positions.setdefault(e, []).append(i)
+
+    # Bit i of matches[e] is set when y[i] == e.
+    matches = {}
+    for e in set(x):
+        if e in positions:
+            bits = np.zeros(n, dtype=bool)
+            bits[positions[e]] = True
+            matches[e] = int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+    mask = (1 << n) - 1
+    row = mask
+    for e in x:
+        u = row & matches.get(e, 0)
+        row = ((row + u) | (row - u)) & mask
+
+    return n - bin(row).count('1')
+
+
+def diff(x, y, engine='myers'):
     """
         Diff two sequences of comparable elements (hopefully strings but since this is Python who knows with what it might work :)). 
 
         Note that I am using ansi escape codes to get colored output, so if terminal (or whatever reads stdout) does not handle them, output might be messy.
+
+        engine - name of function from ENGINES pairing common elements of x and y:
+        'myers' (default, works for large inputs), 'patience' (hunks aligned with unique lines)
+        or 'lcs' (full lcs_table).
     """
     output = []
     j, i = 0, 0
+    for next_j, next_i in ENGINES[engine](x, y) + [(len(x), len(y))]:
+        output.extend(hunk(x, y, j, next_j, i, next_i))
+        j, i = next_j + 1, next_i + 1
+
+    return ''.join(output)
+
+
+def hunk(x, y, j, next_j, i, next_i):
+    """
+        Returns lines describing change of x[j:next_j] into y[i:next_i].
+    """
+    output = []
+    start_j, start_i = j + 1, i + 1
+    if next_j > j:
+        if next_j - j == 1:
+            output.append(f'{start_j}d{start_i}{ANSI.RED}\n')
+        else:
+            output.append(f'{start_j},{next_j}d{start_i}{ANSI.RED}\n')
+        output.extend('< ' + line + '\n' for line in x[j:next_j])
+        output.append(ANSI.STOP)
+
+    if next_i > i:
+        if next_i - i == 1:
+            output.append(f'{start_j - 1}a{start_i}{ANSI.GREEN}\n')
+        else:
+            output.append(f'{start_j - 1}a{start_i},{next_i}{ANSI.GREEN}\n')
+        output.extend('> ' + line + '\n' for line in y[i:next_i])
+        output.append(ANSI.STOP)
+
+    return output
+
+
+def lcs_pairs(x, y):
+    """
+        Returns list of pairs (j, i) of positions with x[j] == y[i] forming lcs(x, y),
+        every common element is paired with its earliest occurrences.
+    """
+    pairs = []
+    j, i = 0, 0
     for common in lcs(x, y):
-        start_i, start_j = i + 1, j + 1
-        changes = []
-        if j < len(x) and x[j] != common:
-            while j < len(x) and x[j] != common:
-                changes.append('< ' + x[j] + '\n')
-                j = j + 1
-            changes.append(ANSI.STOP)
-
-            if len(changes) == 2:
-                output.append(
-                    f'{start_j}d{start_i}{ANSI.RED}\n')
-            else:
-                output.append(
-                    f'{start_j},{start_j + len(changes) - 2}d{start_i}{ANSI.RED}\n')
-            output.extend(changes)
-        j = j + 1
+        while x[j] != common:
+            j = j + 1
+        while y[i] != common:
+            i = i + 1
+        pairs.append((j, i))
+        j, i = j + 1, i + 1
+
+    return pairs
+
+
+def myers_pairs(x, y):
+    """
+        Returns list of pairs (j, i) of positions with x[j] == y[i] forming longest common subsequence,
+        found with Myers' O((N + M) D) algorithm, where D is the number of deleted and inserted elements.
+        Elements are interned to integer ids first, so they have to be hashable.
+    """
+    ids = {}
+    a = [ids.setdefault(e, len(ids)) for e in x]
+    b = [ids.setdefault(e, len(ids)) for e in y]
+
+    pairs = []
+    myers(a, b, 0, len(a), 0, len(b), pairs)
+    return pairs
+
+
+def myers(a, b, lo_a, hi_a, lo_b, hi_b, pairs):
+    """
+        Appends to pairs matches between a[lo_a:hi_a] and b[lo_b:hi_b]. Common prefix and suffix
+        are matched directly, the rest is split at the middle snake and solved recursively,
+        so memory stays linear.
+    """
+    while lo_a < hi_a and lo_b < hi_b and a[lo_a] == b[lo_b]:
+        pairs.append((lo_a, lo_b))
+        lo_a, lo_b = lo_a + 1, lo_b + 1
+
+    suffix = 0
+    while lo_a < hi_a - suffix and lo_b < hi_b - suffix and a[hi_a - suffix - 1] == b[hi_b - suffix - 1]:
+        suffix = suffix + 1
+    hi_a, hi_b = hi_a - suffix, hi_b - suffix
 
-        changes = []
-        if i < len(y) and y[i] != common:
-            while i < len(y) and y[i] != common:
-                changes.append('> ' + y[i] + '\n')
-                i = i + 1
-            changes.append(ANSI.STOP)
+    if lo_a < hi_a and lo_b < hi_b:
+        split = middle_snake(a, b, lo_a, hi_a, lo_b, hi_b)
+        if split is not None:
+            x, y = split
+            myers(a, b, lo_a, x, lo_b, y, pairs)
+            myers(a, b, x, hi_a, y, hi_b, pairs)
 
-            if len(changes) == 2:
-                output.append(
-                    f'{start_j - 1}a{start_i}{ANSI.GREEN}\n')
+    pairs.extend((hi_a + k, hi_b + k) for k in range(suffix))
+
+
+def middle_snake(a, b, lo_a, hi_a, lo_b, hi_b):
+    """
+        Runs greedy search for shortest edit script from both ends at once, v[k] holds furthest x
+        reached on diagonal k = x - y. When paths meet, returns point (in a, b) which lies
+        on a shortest edit script, after about half of its edits. None if nothing is common.
+    """
+    n, m = hi_a - lo_a, hi_b - lo_b
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [-1] * (2 * offset + 2)
+    forward[offset + 1] = 0
+    backward = forward[:]
+    delta = n - m
+    odd = delta % 2 != 0
+
+    # Diagonals which left the grid are skipped from then on.
+    forward_start = forward_end = backward_start = backward_end = 0
+    for d in range(max_d):
+        for k in range(-d + forward_start, d + 1 - forward_end, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
             else:
-                output.append(
-                    f'{start_j - 1}a{start_i},{start_i + len(changes) - 2}{ANSI.GREEN}\n')
-            output.extend(changes)
-        i = i + 1
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[lo_a + x] == b[lo_b + y]:
+                x, y = x + 1, y + 1
+            forward[offset + k] = x
+
+            if x > n:
+                forward_end = forward_end + 2
+            elif y > m:
+                forward_start = forward_start + 2
+            elif odd:
+                other = offset + delta - k
+                if 0 <= other < len(backward) and backward[other] != -1 and x >= n - backward[other]:
+                    return lo_a + x, lo_b + y
+
+        for k in range(-d + backward_start, d + 1 - backward_end, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[hi_a - x - 1] == b[hi_b - y - 1]:
+                x, y = x + 1, y + 1
+            backward[offset + k] = x
+
+            if x > n:
+                backward_end = backward_end + 2
+            elif y > m:
+                backward_start = backward_start + 2
+            elif not odd:
+                other = offset + delta - k
+                if 0 <= other < len(forward) and forward[other] != -1:
+                    forward_x = forward[other]
+                    forward_y = forward_x - (delta - k)
+                    if forward_x >= n - x:
+                        return lo_a + forward_x, lo_b + forward_y
+
+    return None
+
+
+def patience_pairs(x, y):
+    """
+        Returns list of pairs (j, i) of positions with x[j] == y[i] found by patience diff:
+        lines occurring exactly once in both x and y are anchors, longest run of anchors
+        in the same order in both is matched and gaps between them are solved recursively
+        (with myers when gap has no anchors). Result need not be the longest, but hunks
+        stay aligned with unique lines instead of braces or blank lines.
+        Elements are interned to integer ids first, so they have to be hashable.
+    """
+    ids = {}
+    a = [ids.setdefault(e, len(ids)) for e in x]
+    b = [ids.setdefault(e, len(ids)) for e in y]
 
-    start_i, start_j = i + 1, j + 1
-    changes = []
-    if j < len(x):
-        while j < len(x):
-            changes.append('< ' + x[j] + '\n')
-            j = j + 1
-        changes.append(ANSI.STOP)
+    pairs = []
+    patience(a, b, 0, len(a), 0, len(b), pairs)
+    return pairs
+
+
+def patience(a, b, lo_a, hi_a, lo_b, hi_b, pairs):
+    while lo_a < hi_a and lo_b < hi_b and a[lo_a] == b[lo_b]:
+        pairs.append((lo_a, lo_b))
+        lo_a, lo_b = lo_a + 1, lo_b + 1
+
+    suffix = 0
+    while lo_a < hi_a - suffix and lo_b < hi_b - suffix and a[hi_a - suffix - 1] == b[hi_b - suffix - 1]:
+        suffix = suffix + 1
+    hi_a, hi_b = hi_a - suffix, hi_b - suffix
 
-        if len(changes) == 2:
-            output.append(
-                f'{start_j}d{start_i}{ANSI.RED}\n')
+    if lo_a < hi_a and lo_b < hi_b:
+        anchors = unique_anchors(a, b, lo_a, hi_a, lo_b, hi_b)
+        if not anchors:
+            myers(a, b, lo_a, hi_a, lo_b, hi_b, pairs)
         else:
-            output.append(
-                f'{start_j},{start_j + len(changes) - 2}d{start_i}{ANSI.RED}\n')
-        output.extend(changes)
-
-    changes = []
-    if i < len(y):
-        while i < len(y):
-            changes.append('> ' + y[i] + '\n')
-            i = i + 1
-        changes.append(ANSI.STOP)
+            j, i = lo_a, lo_b
+            for anchor_j, anchor_i in anchors:
+                patience(a, b, j, anchor_j, i, anchor_i, pairs)
+                pairs.append((anchor_j, anchor_i))
+                j, i = anchor_j + 1, anchor_i + 1
+            patience(a, b, j, hi_a, i, hi_b, pairs)
+
+    pairs.extend((hi_a + k, hi_b + k) for k in range(suffix))
 
-        if len(changes) == 2:
-            output.append(
-                f'{start_j - 1}a{start_i}{ANSI.GREEN}\n')
+
+def unique_anchors(a, b, lo_a, hi_a, lo_b, hi_b):
+    """
+        Returns longest list of pairs (j, i) increasing in both positions with a[j] == b[i]
+        occurring once in a[lo_a:hi_a] and once in b[lo_b:hi_b] (patience sorting).
+    """
+    counts_a = Counter(a[lo_a:hi_a])
+    counts_b = Counter(b[lo_b:hi_b])
+    position_b = {b[i]: i for i in range(lo_b, hi_b) if counts_b[b[i]] == 1}
+    candidates = [(j, position_b[a[j]]) for j in range(lo_a, hi_a)
+                  if counts_a[a[j]] == 1 and a[j] in position_b]
+
+    # tops[p] - smallest position in b ending increasing run of length p + 1.
+    tops, ends, previous = [], [], []
+    for k, (_, i) in enumerate(candidates):
+        p = bisect_left(tops, i)
+        previous.append(ends[p - 1] if p else -1)
+        if p == len(tops):
+            tops.append(i)
+            ends.append(k)
         else:
-            output.append(
-                f'{start_j - 1}a{start_i},{start_i + len(changes) - 2}{ANSI.GREEN}\n')
-        output.extend(changes)
+            tops[p] = i
+            ends[p] = k
+
+    anchors = []
+    k = ends[-1] if ends else -1
+    while k != -1:
+        anchors.append(candidates[k])
+        k = previous[k]
+    anchors.reverse()
+
+    return anchors
 
-    return ''.join(output)
+
+ENGINES = {'myers': myers_pairs, 'patience': patience_pairs, 'lcs': lcs_pairs}
 
 
 def diff_line(x, y):
@@ -205,12 +639,23 @@ class ANSI:
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print(ANSI.BLUE + 'Please pass two valid text files.' + ANSI.STOP)
+    # --mmap diffs two files with diff_files_mmap (for files too large to read whole).
+    use_mmap = '--mmap' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--mmap']
+    if len(args) != 2:
+        print(ANSI.BLUE + 'Please pass two valid text files or two directories '
+              '(optionally with --mmap for large files).' + ANSI.STOP)
         exit()
 
-    original = sys.argv[1]
-    new = sys.argv[2]
+    original = args[0]
+    new = args[1]
+
+    if os.path.isdir(original) and os.path.isdir(new):
+        diff_trees(original, new)
+        exit()
 
     print(ANSI.BLUE + '@@ Diff @@' + ANSI.STOP)
-    diff_files(original, new)
+    if use_mmap:
+        diff_files_mmap(original, new)
+    else:
+        diff_files(original, new)
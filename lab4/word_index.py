@@ -0,0 +1,98 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+# Key under which trie node keeps word ending in it.
+WORD = None
+
+
+class WordIndex:
+    """
+        Trie over a word list answering which words are within given edit distance
+        (unit costs, as edit.edit_distance) from a query. Walking the trie computes one row of
+        edit table per node, so words with common prefix share rows, and subtrees whose row
+        minimum already exceeds k are never entered.
+
+        Nodes are plain dicts (letter -> child, WORD -> word), so index pickles quickly (see save/load).
+    """
+
+    def __init__(self, words=()):
+        self.root = {}
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        node = self.root
+        for letter in word:
+            node = node.setdefault(letter, {})
+        if WORD not in node:
+            node[WORD] = word
+            self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def search(self, query, k):
+        """
+            Returns list of pairs (word, distance) with distance at most k, closest first.
+        """
+        row = list(range(len(query) + 1))
+        results = []
+        if WORD in self.root and row[-1] <= k:
+            results.append((self.root[WORD], row[-1]))
+
+        for letter, child in self.root.items():
+            if letter is not WORD:
+                self.walk(child, letter, query, row, k, results)
+
+        results.sort(key=lambda result: (result[1], result[0]))
+        return results
+
+    def walk(self, node, letter, query, previous, k, results):
+        row = [previous[0] + 1]
+        for i in range(1, len(query) + 1):
+            row.append(min(row[i - 1] + 1, previous[i] + 1,
+                           previous[i - 1] + (query[i - 1] != letter)))
+
+        if WORD in node and row[-1] <= k:
+            results.append((node[WORD], row[-1]))
+
+        if min(row) <= k:
+            for letter, child in node.items():
+                if letter is not WORD:
+                    self.walk(child, letter, query, row, k, results)
+
+    def search_many(self, queries, k, workers=None):
+        """
+            Returns list with results of search for every query. With workers > 1 queries
+            are spread over processes, each of them gets the index once.
+        """
+        if workers is None or workers <= 1:
+            return [self.search(query, k) for query in queries]
+
+        queries = list(queries)
+        chunksize = max(1, len(queries) // (4 * workers))
+        with ProcessPoolExecutor(workers, initializer=_set_index, initargs=(self,)) as executor:
+            return list(executor.map(_search, queries, [k] * len(queries), chunksize=chunksize))
+
+    def save(self, filename):
+        with open(filename, 'wb') as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as file:
+            return pickle.load(file)
+
+
+# Index of worker process (see WordIndex.search_many).
+_index = None
+
+
+def _set_index(index):
+    global _index
+    _index = index
+
+
+def _search(query, k):
+    return _index.search(query, k)
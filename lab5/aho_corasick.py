@@ -1,4 +1,6 @@
+import mmap
 from collections import deque
+import numpy as np
 
 # ----------------------
 # Data structure
@@ -229,3 +231,187 @@ def print_matches(text, patterns):
     for i, ptr_idx in search(text, patterns):
         print(f'Found {patterns[ptr_idx]} at {i}')
     print('-' * 64)
+
+
+# ----------------------
+# Compiled automaton
+# ----------------------
+
+# Compiled automaton reads bytes.
+ALPHABET = 256
+
+
+class Automaton:
+    """
+        Aho-Corasick machine compiled into full DFA (see compile_automaton):
+            - goto - int32[no_states, ALPHABET] table of transitions with failure links already followed,
+            - outputs of state s are patterns[output_patterns[output_start[s]:output_start[s + 1]]],
+            - lengths - int32 array with length of every pattern (in bytes).
+        State 0 is the root.
+    """
+
+    def __init__(self, goto, output_start, output_patterns, lengths):
+        self.goto = goto
+        self.output_start = output_start
+        self.output_patterns = output_patterns
+        self.lengths = lengths
+        self.accepting = np.diff(output_start) > 0
+        # Scans one byte at a time index these views instead of numpy arrays, which is much faster
+        # and needs no copy: state after reading byte from state s is flat[s * ALPHABET + byte].
+        self.flat = memoryview(goto.reshape(-1))
+        self.accepting_flags = memoryview(self.accepting)
+        # Outputs of accepting states only.
+        self.outputs = {s: output_patterns[output_start[s]:output_start[s + 1]].tolist()
+                        for s in np.flatnonzero(self.accepting).tolist()}
+
+
+def as_bytes(data):
+    return data.encode('UTF-8') if isinstance(data, str) else bytes(data)
+
+
+def compile_automaton(patterns):
+    """
+        Builds trie with failure links (see preprocess) over bytes of patterns (str are encoded as UTF-8)
+        and turns it into table of transitions, so searching takes single lookup per byte.
+        In BFS order failure of a state is compiled before it, so its row is just failure's row
+        with trie edges written over.
+    """
+    patterns = [as_bytes(pattern) for pattern in patterns]
+    root = preprocess(patterns)
+
+    order = []
+    q = deque([root])
+    while q:
+        r = q.popleft()
+        order.append(r)
+        q.extend(r.get_chidren())
+
+    goto = np.zeros((len(order), ALPHABET), dtype=np.int32)
+    output_start = np.zeros(len(order) + 1, dtype=np.int32)
+    output_patterns = []
+    for r in order:
+        if r is not root:
+            goto[r.id] = goto[r.get_fail().id]
+        for p in r.get_chidren():
+            goto[r.id, p.v] = p.id
+
+    outputs = {r.id: sorted(r.get_output()) for r in order if r.is_accepting()}
+    for s in range(len(order)):
+        output_patterns.extend(outputs.get(s, []))
+        output_start[s + 1] = len(output_patterns)
+
+    lengths = np.array([len(pattern) for pattern in patterns], dtype=np.int32)
+    return Automaton(goto, output_start, np.array(output_patterns, dtype=np.int32), lengths)
+
+
+def dfa_search(data, automaton):
+    """
+        Same as search, but runs on compiled automaton (see compile_automaton)
+        and positions are byte offsets in data (str is encoded as UTF-8).
+    """
+    flat, outputs, lengths = automaton.flat, automaton.outputs, automaton.lengths.tolist()
+    accepting = automaton.accepting_flags
+    state = 0
+    for i, byte in enumerate(as_bytes(data)):
+        state = flat[state * ALPHABET + byte]
+        if accepting[state]:
+            for pattern_idx in outputs[state]:
+                yield (i - lengths[pattern_idx] + 1, pattern_idx)
+
+
+def dfa_search_many(texts, automaton):
+    """
+        Searches many texts at once: all of them advance one byte per step with a single
+        numpy lookup in goto table. Returns list with list of (start, pattern_idx) for every text.
+        Works best for many short texts (like log lines), since it takes as many steps as the longest one.
+    """
+    texts = [as_bytes(text) for text in texts]
+    sizes = np.array([len(text) for text in texts], dtype=np.int64)
+    longest = int(sizes.max()) if len(texts) else 0
+
+    # Shorter texts are padded with zeros, matches past their end are dropped.
+    data = np.zeros((len(texts), longest), dtype=np.uint8)
+    for k, text in enumerate(texts):
+        data[k, :len(text)] = np.frombuffer(text, dtype=np.uint8)
+
+    states = np.zeros(len(texts), dtype=np.int32)
+    found_texts, found_ends, found_states = [], [], []
+    for i in range(longest):
+        states = automaton.goto[states, data[:, i]]
+        hits = np.flatnonzero(automaton.accepting[states] & (i < sizes))
+        if len(hits):
+            found_texts.append(hits)
+            found_ends.append(np.full(len(hits), i))
+            found_states.append(states[hits])
+
+    results = [[] for _ in texts]
+    if found_texts:
+        for k, i, state in zip(np.concatenate(found_texts).tolist(), np.concatenate(found_ends).tolist(),
+                               np.concatenate(found_states).tolist()):
+            for pattern_idx in automaton.outputs[state]:
+                results[k].append((i - int(automaton.lengths[pattern_idx]) + 1, pattern_idx))
+
+    return results
+
+
+# ----------------------
+# Streaming search
+# ----------------------
+
+# Bytes read from a file at once.
+CHUNK_SIZE = 1 << 20
+
+
+class Matcher:
+    """
+        Reusable search over stream of byte chunks on compiled automaton (see compile_automaton),
+        automaton state is kept between chunks, so matches crossing chunk boundaries are found
+        and positions are offsets from the beginning of the stream.
+    """
+
+    def __init__(self, patterns=None, automaton=None):
+        self.automaton = automaton if automaton is not None else compile_automaton(patterns)
+        self.flat = self.automaton.flat
+        self.outputs = self.automaton.outputs
+        self.accepting = self.automaton.accepting_flags
+        self.lengths = self.automaton.lengths.tolist()
+        self.reset()
+
+    def reset(self):
+        """ Starts new stream. """
+        self.state = 0
+        self.offset = 0
+
+    def feed(self, chunk):
+        """
+            Returns list of (start, pattern_idx) for matches ending in chunk.
+        """
+        flat, outputs, accepting, lengths = self.flat, self.outputs, self.accepting, self.lengths
+        found = []
+        state = self.state
+        offset = self.offset + 1
+        chunk = as_bytes(chunk)
+        for i, byte in enumerate(chunk):
+            state = flat[state * ALPHABET + byte]
+            if accepting[state]:
+                for pattern_idx in outputs[state]:
+                    found.append((offset + i - lengths[pattern_idx], pattern_idx))
+
+        self.state = state
+        self.offset += len(chunk)
+        return found
+
+    def scan(self, chunks):
+        """ Generator of matches in iterable of chunks (e.g. reads from socket). """
+        for chunk in chunks:
+            yield from self.feed(chunk)
+
+    def scan_file(self, filename, chunk_size=CHUNK_SIZE):
+        """ Generator of matches in file, which is memory mapped and fed chunk by chunk. """
+        with open(filename, 'rb') as file:
+            # Empty files cannot be mapped.
+            if not file.seek(0, 2):
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for start in range(0, len(data), chunk_size):
+                    yield from self.feed(data[start:start + chunk_size])